@@ -1,11 +1,49 @@
+import argparse
+import errno
+import gzip
 import os
 import sys
 import re
+import csv
+import json
+import sqlite3
+import hashlib
 import time
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import threading
 import queue
 
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.flv', '.wmv')
+
+# 扫描目录时的默认并发线程数；网络共享上每次读取目录都要等待往返，可以调大
+SCAN_WORKERS = 8
+
+# 读取目录遇到临时错误时的重试次数和首次重试间隔（秒），之后每次翻倍
+SCAN_RETRIES = 3
+SCAN_RETRY_DELAY = 0.5
+
+# 网络文件系统（NFS/SMB）上可能只是暂时失败的错误
+TRANSIENT_ERRNOS = {getattr(errno, name) for name in
+                    ("EAGAIN", "EINTR", "EBUSY", "EIO", "ETIMEDOUT", "ECONNRESET", "ECONNABORTED", "ESTALE")
+                    if hasattr(errno, name)}
+# Windows：找不到网络路径、网络名不再可用、信号灯超时
+TRANSIENT_WINERRORS = {53, 64, 121}
+
+# 扫描快照文件的格式标识、版本和建议的扩展名
+SNAPSHOT_FORMAT = "media-compare-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".mcsnap"
+
+# 修改时间距今不足该秒数的目录不记录到索引，避免同一时间粒度内的后续修改被漏掉
+INDEX_SETTLE_SECONDS = 2
+
+# 抽样指纹在文件头、中、尾各读取的字节数
+FINGERPRINT_CHUNK = 1024 * 1024
+
+# 计算指纹的默认进程数
+FINGERPRINT_WORKERS = min(8, os.cpu_count() or 1)
+
 def convert_size(size_bytes):
     """将字节转换为更友好的单位 (MB/GB)"""
     if size_bytes < 1024 * 1024:
@@ -15,9 +53,11 @@ def convert_size(size_bytes):
     else:
         return f"{size_bytes / (1024 * 1024 * 1024):.2f}GB"
 
+RESOLUTION_PATTERN = re.compile(r'(\d{3,4}p)', re.IGNORECASE)
+
 def extract_resolution(filename):
     """从文件名中提取分辨率信息"""
-    match = re.search(r'(\d{3,4}p)', filename, re.IGNORECASE)
+    match = RESOLUTION_PATTERN.search(filename)
     return match.group(1).upper() if match else "未知分辨率"
 
 def extract_season_episode(filename):
@@ -25,66 +65,566 @@ def extract_season_episode(filename):
     match = re.search(r'(S\d{1,2}E\d{1,2})', filename, re.IGNORECASE)
     return match.group(0).upper() if match else None
 
-def get_dir_structure(root_dir, mode, progress_queue):
-    """获取目录结构"""
-    dir_structure = defaultdict(list)
+def is_transient_error(error):
+    """判断 OSError 是否可能是网络共享上的临时错误，值得重试"""
+    return error.errno in TRANSIENT_ERRNOS or getattr(error, "winerror", None) in TRANSIENT_WINERRORS
+
+def with_retries(func, *args):
+    """调用 func，遇到临时错误时按指数退避重试，其他错误或重试用尽时抛出"""
+    for attempt in range(SCAN_RETRIES + 1):
+        try:
+            return func(*args)
+        except OSError as e:
+            if attempt == SCAN_RETRIES or not is_transient_error(e):
+                raise
+            time.sleep(SCAN_RETRY_DELAY * 2 ** attempt)
+
+def list_directory(folder, rel_path, mode):
+    """读取一个目录，返回 (视频文件列表, 子目录相对路径列表, 读取失败的目录项 [(相对路径, 错误)])
     
-    # 获取所有目录列表
-    all_dirs = []
-    for root, dirs, files in os.walk(root_dir):
-        all_dirs.append(root)
+    取文件大小遇到临时错误时单独重试，仍然失败的目录项跳过并记入读取失败的列表。
+    """
+    video_files = []
+    subdirs = []
+    unreadable = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                # 与 os.walk 一致，不进入指向目录的符号链接
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name if rel_path == "." else os.path.join(rel_path, entry.name))
+                elif entry.name.lower().endswith(VIDEO_EXTENSIONS) and entry.is_file():
+                    if mode == "movie":
+                        video_files.append((entry.name, with_retries(entry.stat).st_size, extract_resolution(entry.name)))
+                    else:
+                        episode_key = extract_season_episode(entry.name)
+                        if episode_key:
+                            video_files.append((entry.name, with_retries(entry.stat).st_size, episode_key))
+            except OSError as e:
+                unreadable.append((entry.name if rel_path == "." else os.path.join(rel_path, entry.name), str(e)))
+    return video_files, subdirs, unreadable
+
+def scan_directory(root_dir, rel_path, mode, failed=None):
+    """用 os.scandir 单次遍历一个目录
     
-    for foldername in all_dirs:
-        # 更新进度
-        progress_queue.put(foldername)
+    返回 (视频文件列表, 子目录相对路径列表)，目录无法读取时返回 None。
+    文件类型来自目录项本身，每个视频文件只需一次 stat 取大小。
+    打开或遍历目录时遇到临时错误（网络共享超时等）会重新读取整个目录，最多重试 SCAN_RETRIES 次。
+    重试后仍无法读取的目录或文件以 (相对路径, 错误) 记入 failed；扫描期间被删除的目录不算读取失败。
+    """
+    folder = root_dir if rel_path == "." else os.path.join(root_dir, rel_path)
+    try:
+        video_files, subdirs, unreadable = with_retries(list_directory, folder, rel_path, mode)
+    except OSError as e:
+        if failed is not None and e.errno != errno.ENOENT:
+            failed.append((rel_path, str(e)))
+        return None
+    if failed is not None:
+        failed.extend(unreadable)
+    return video_files, subdirs
+
+class ScanIndex:
+    """持久化的扫描索引（SQLite），按 (根目录, 模式, 相对路径) 保存目录的修改时间、视频文件和子目录
+    
+    再次扫描时目录修改时间未变的直接使用索引中的结果，只重新读取有变化的目录。
+    目录的修改时间只在其中的文件增删或改名时变化，原地改写文件内容（不改名）不会被发现。
+    """
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS dirs (
+            root TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            mtime_ns INTEGER,
+            files TEXT NOT NULL,
+            subdirs TEXT NOT NULL,
+            PRIMARY KEY (root, mode, rel_path)
+        )""")
+        self.conn.commit()
+    
+    def load(self, root_dir, mode):
+        """读取一个根目录的索引 {相对路径: (修改时间, 视频文件列表, 子目录列表)}"""
+        with self.lock:
+            rows = self.conn.execute("SELECT rel_path, mtime_ns, files, subdirs FROM dirs WHERE root = ? AND mode = ?",
+                                     (os.path.abspath(root_dir), mode)).fetchall()
+        return {rel_path: (mtime_ns, [tuple(f) for f in json.loads(files)], json.loads(subdirs))
+                for rel_path, mtime_ns, files, subdirs in rows}
+    
+    def save(self, root_dir, mode, known, scanned, kept=()):
+        """写入本次扫描结果：更新有变化的目录，删除已不存在的目录
         
+        kept 为本次读取失败的目录，它们及其下所有目录在索引中的记录原样保留。
+        """
+        root = os.path.abspath(root_dir)
+        changed = [(root, mode, rel_path, entry[0], json.dumps(entry[1], ensure_ascii=False),
+                    json.dumps(entry[2], ensure_ascii=False))
+                   for rel_path, entry in scanned.items() if known.get(rel_path) != entry]
+        prefixes = tuple("" if path == "." else path + os.sep for path in kept)
+        removed = [(root, mode, rel_path) for rel_path in known.keys() - scanned.keys()
+                   if rel_path not in kept and not rel_path.startswith(prefixes)]
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)", changed)
+                self.conn.executemany("DELETE FROM dirs WHERE root = ? AND mode = ? AND rel_path = ?", removed)
+        return len(changed), len(removed)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def read_at(f, offset, length):
+    """从指定位置读取，支持 os.pread 时不移动文件指针"""
+    if hasattr(os, "pread"):
+        return os.pread(f.fileno(), length, offset)
+    f.seek(offset)
+    return f.read(length)
+
+def sample_fingerprint(path):
+    """抽样指纹：文件大小 + 头、中、尾三段内容的哈希，文件无法读取时返回 None
+    
+    只读取 3 * FINGERPRINT_CHUNK 字节，与文件大小无关。
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+            if size <= 3 * FINGERPRINT_CHUNK:
+                digest.update(read_at(f, 0, size))
+            else:
+                for offset in (0, (size - FINGERPRINT_CHUNK) // 2, size - FINGERPRINT_CHUNK):
+                    digest.update(read_at(f, offset, FINGERPRINT_CHUNK))
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def full_hash(path):
+    """完整读取文件计算哈希，文件无法读取时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            digest = hashlib.blake2b(digest_size=16)
+            for chunk in iter(lambda: f.read(4 * FINGERPRINT_CHUNK), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+class FingerprintCache:
+    """抽样指纹缓存（SQLite），按 (路径, 大小, 修改时间) 命中，文件未变时不再读取内容"""
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS fingerprints (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            digest TEXT NOT NULL
+        )""")
+        self.conn.commit()
+    
+    def get(self, path, size, mtime_ns):
+        row = self.conn.execute("SELECT digest FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                (path, size, mtime_ns)).fetchone()
+        return row[0] if row else None
+    
+    def put_many(self, rows):
+        """rows 为 [(路径, 大小, 修改时间, 指纹)]"""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)", rows)
+    
+    def close(self):
+        self.conn.close()
+
+def fingerprint_files(paths, cache=None, workers=FINGERPRINT_WORKERS):
+    """计算一批文件的抽样指纹，返回 ({路径: 指纹}, 缓存命中数)
+    
+    缓存未命中的文件分给进程池计算，哈希计算不受 GIL 限制。
+    """
+    fingerprints = {}
+    todo = []
+    for path in paths:
         try:
-            filenames = os.listdir(foldername)
-        except Exception as e:
+            st = os.stat(path)
+        except OSError:
+            fingerprints[path] = None
             continue
-            
-        rel_path = os.path.relpath(foldername, root_dir)
-        
-        # 电影模式：每个目录视为一个电影
+        digest = cache.get(os.path.abspath(path), st.st_size, st.st_mtime_ns) if cache else None
+        if digest:
+            fingerprints[path] = digest
+        else:
+            todo.append((path, st.st_size, st.st_mtime_ns))
+    
+    if todo:
+        todo_paths = [path for path, _, _ in todo]
+        if len(todo) == 1 or workers <= 1:
+            digests = [sample_fingerprint(path) for path in todo_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                digests = list(pool.map(sample_fingerprint, todo_paths, chunksize=8))
+        fingerprints.update(zip(todo_paths, digests))
+        if cache:
+            cache.put_many([(os.path.abspath(path), size, mtime_ns, digest)
+                            for (path, size, mtime_ns), digest in zip(todo, digests) if digest])
+    return fingerprints, len(paths) - len(todo)
+
+def same_size_pairs(structure1, structure2, base1, base2, mode):
+    """找出按名称和大小会被视为相同的文件对 [(整理包路径, 媒体库包路径)]
+    
+    电影模式按分辨率配对，剧集模式按文件名配对，与报告中的比较规则一致。
+    """
+    pairs = []
+    for dir_path in structure1.keys() & structure2.keys():
         if mode == "movie":
-            # 只处理直接包含视频文件的目录（一级目录）
-            if os.path.dirname(rel_path) == "":
-                video_files = []
-                for filename in filenames:
-                    filepath = os.path.join(foldername, filename)
-                    if os.path.isfile(filepath) and filename.lower().endswith(('.mkv', '.mp4', '.avi', '.mov', '.flv', '.wmv')):
-                        try:
-                            size = os.path.getsize(filepath)
-                            resolution = extract_resolution(filename)
-                            video_files.append((filename, size, resolution))
-                        except:
-                            continue
-                
+            by_res1 = {resolution: (filename, size) for filename, size, resolution in structure1[dir_path]}
+            by_res2 = {resolution: (filename, size) for filename, size, resolution in structure2[dir_path]}
+            matched = [(by_res1[res][0], by_res2[res][0]) for res in by_res1.keys() & by_res2.keys()
+                       if by_res1[res][1] == by_res2[res][1]]
+        else:
+            files2 = {(filename, size) for filename, size, _ in structure2[dir_path]}
+            matched = [(filename, filename) for filename, size, _ in structure1[dir_path]
+                       if (filename, size) in files2]
+        for filename1, filename2 in matched:
+            pairs.append((os.path.join(base1, dir_path, filename1), os.path.join(base2, dir_path, filename2)))
+    return pairs
+
+def check_content(pairs, cache=None, verify=False, workers=FINGERPRINT_WORKERS):
+    """比较大小相同的文件对的内容，返回 {(路径1, 路径2): 说明}，只包含内容不同的文件对
+    
+    先比较抽样指纹；verify 为真时对指纹不同的文件对再完整读取校验，
+    可排除修改时间被保留导致的缓存误判。
+    """
+    paths = sorted({path for pair in pairs for path in pair})
+    fingerprints, cached = fingerprint_files(paths, cache, workers)
+    print(f"  内容指纹: {len(paths)} 个文件，{cached} 个来自缓存")
+    
+    flagged = [pair for pair in pairs if fingerprints[pair[0]] != fingerprints[pair[1]]]
+    if not verify:
+        return {pair: "抽样指纹不同" for pair in flagged}
+    
+    differs = {}
+    flagged_paths = sorted({path for pair in flagged for path in pair})
+    if flagged_paths:
+        print(f"  完整校验: {len(flagged)} 对文件")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            hashes = dict(zip(flagged_paths, pool.map(full_hash, flagged_paths)))
+        for pair in flagged:
+            if hashes[pair[0]] != hashes[pair[1]] or hashes[pair[0]] is None:
+                differs[pair] = "完整校验不同"
+    return differs
+
+def unmatched_files(structure, other, mode):
+    """找出报告中会列为一边有、一边无的文件 [(目录, 文件名, 大小, 季集或分辨率)]，是移动或改名的候选
+    
+    电影模式为另一边同目录中没有该分辨率的文件；剧集模式为另一边同目录中没有该季集，
+    或有该季集但既没有同名同大小的文件，也没有同分辨率不同大小的文件（即目录内改名）。
+    """
+    unmatched = []
+    for dir_path, files in structure.items():
+        other_files = other.get(dir_path, [])
+        other_keys = {key for _, _, key in other_files}
+        other_names = {(filename, size) for filename, size, _ in other_files}
+        other_sizes = None
+        for filename, size, key in files:
+            if key not in other_keys:
+                unmatched.append((dir_path, filename, size, key))
+            elif mode == "tv" and (filename, size) not in other_names:
+                if other_sizes is None:
+                    other_sizes = defaultdict(set)
+                    for other_name, other_size, other_key in other_files:
+                        other_sizes[(other_key, extract_resolution(other_name))].add(other_size)
+                if not other_sizes[(key, extract_resolution(filename))] - {size}:
+                    unmatched.append((dir_path, filename, size, key))
+    return unmatched
+
+def detect_moves(structure1, structure2, base1, base2, mode, fingerprint=False, cache=None):
+    """在两边一边有、一边无的文件之间查找移动或改名的文件
+    
+    两边的候选文件按 (大小, 季集或分辨率) 建立哈希索引配对，开启内容指纹时只为
+    能配上的候选计算指纹并加入配对键，整体接近线性。不开启内容指纹时只接受唯一的配对。
+    返回 (移动列表 [(目录1, 文件名1, 目录2, 文件名2, 大小)], 去掉已移动文件后的两边目录结构)。
+    """
+    candidates1 = unmatched_files(structure1, structure2, mode)
+    candidates2 = unmatched_files(structure2, structure1, mode)
+    
+    by_key = defaultdict(list)
+    for dir_path, filename, size, key in sorted(candidates2):
+        by_key[(size, key)].append((dir_path, filename))
+    candidates1 = [c for c in sorted(candidates1) if (c[2], c[3]) in by_key]
+    if not fingerprint:
+        # 只按大小配对时，同一个键在任一边出现多次就无法确定对应关系，不作猜测
+        counts = defaultdict(int)
+        for _, _, size, key in candidates1:
+            counts[(size, key)] += 1
+        by_key = {k: targets for k, targets in by_key.items() if len(targets) == 1 and counts[k] == 1}
+        candidates1 = [c for c in candidates1 if (c[2], c[3]) in by_key]
+    
+    fingerprints = {}
+    if fingerprint and candidates1:
+        paths = [os.path.join(base1, dir_path, filename) for dir_path, filename, _, _ in candidates1]
+        paths += [os.path.join(base2, dir_path, filename)
+                  for dir_path, filename, size, key in candidates2 if (size, key) in by_key]
+        fingerprints, _ = fingerprint_files(paths, cache)
+        by_digest = defaultdict(list)
+        for (size, key), targets in by_key.items():
+            for dir_path, filename in targets:
+                digest = fingerprints.get(os.path.join(base2, dir_path, filename))
+                if digest:
+                    by_digest[(size, key, digest)].append((dir_path, filename))
+        by_key = by_digest
+    
+    moves = []
+    for dir_path, filename, size, key in candidates1:
+        match_key = (size, key)
+        if fingerprint:
+            match_key += (fingerprints.get(os.path.join(base1, dir_path, filename)),)
+        targets = by_key.get(match_key)
+        if targets:
+            # 有多个候选时优先同名文件
+            pick = next((i for i, (_, name) in enumerate(targets) if name == filename), 0)
+            dir2, filename2 = targets.pop(pick)
+            moves.append((dir_path, filename, dir2, filename2, size))
+    
+    if not moves:
+        return moves, structure1, structure2
+    
+    moved1 = {(dir1, filename1) for dir1, filename1, _, _, _ in moves}
+    moved2 = {(dir2, filename2) for _, _, dir2, filename2, _ in moves}
+    remaining1 = {dir_path: [f for f in files if (dir_path, f[0]) not in moved1] for dir_path, files in structure1.items()}
+    remaining2 = {dir_path: [f for f in files if (dir_path, f[0]) not in moved2] for dir_path, files in structure2.items()}
+    return moves, remaining1, remaining2
+
+def scan_directory_indexed(root_dir, rel_path, mode, known, scanned, failed, kept):
+    """修改时间与索引一致时直接返回索引中的结果，否则重新扫描并记入 scanned
+    
+    目录或其中的文件读取失败时记入 kept，索引中该目录原有的记录不被覆盖或删除。
+    """
+    folder = root_dir if rel_path == "." else os.path.join(root_dir, rel_path)
+    try:
+        mtime_ns = with_retries(os.stat, folder).st_mtime_ns
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            failed.append((rel_path, str(e)))
+            kept.add(rel_path)
+        return None
+    
+    entry = known.get(rel_path)
+    if entry is not None and entry[0] == mtime_ns:
+        scanned[rel_path] = entry
+        return entry[1], entry[2]
+    
+    unreadable = []
+    result = scan_directory(root_dir, rel_path, mode, unreadable)
+    failed.extend(unreadable)
+    if unreadable:
+        kept.add(rel_path)
+    elif result is not None:
+        if time.time() - mtime_ns / 1e9 < INDEX_SETTLE_SECONDS:
+            mtime_ns = None
+        scanned[rel_path] = (mtime_ns, result[0], result[1])
+    return result
+
+def get_dir_structure(root_dir, mode, progress_queue, workers=SCAN_WORKERS, index=None, failed=None):
+    """获取目录结构
+    
+    workers 个线程共用一个先进先出的目录队列（广度优先）：每个线程读完一个目录后把子目录放回队列，
+    空闲的线程随即取走下一个目录，同时进行的目录读取数始终不超过 workers。
+    网络共享上读取目录主要在等待往返，调大 workers 可以让更多请求同时进行。
+    电影模式只看根目录和一级目录，不再进入更深的目录。
+    指定 index（ScanIndex）时只重新读取修改时间有变化的目录。
+    重试后仍无法读取的目录和文件以 (相对路径, 错误) 记入 failed，它们不在返回的目录结构中。
+    """
+    dir_structure = {}
+    if failed is None:
+        failed = []
+    scan = lambda root, rel_path, mode: scan_directory(root, rel_path, mode, failed)
+    if index is not None:
+        known = index.load(root_dir, mode)
+        scanned = {}
+        kept = set()
+        scan = lambda root, rel_path, mode: scan_directory_indexed(root, rel_path, mode, known, scanned, failed, kept)
+    
+    todo = queue.Queue()
+    todo.put(".")
+    errors = []
+    
+    def worker():
+        while True:
+            rel_path = todo.get()
+            if rel_path is None:
+                return
+            try:
+                result = scan(root_dir, rel_path, mode)
+                # 更新进度
+                progress_queue.put(os.path.join(root_dir, rel_path))
+                if result is None:
+                    continue
+                video_files, subdirs = result
                 if video_files:
                     dir_structure[rel_path] = video_files
-        
-        # 剧集模式
-        elif mode == "tv":
-            for filename in filenames:
-                filepath = os.path.join(foldername, filename)
-                if os.path.isfile(filepath) and filename.lower().endswith(('.mkv', '.mp4', '.avi', '.mov', '.flv', '.wmv')):
-                    try:
-                        size = os.path.getsize(filepath)
-                        episode_key = extract_season_episode(filename)
-                        
-                        if episode_key:
-                            dir_structure[rel_path].append((filename, size, episode_key))
-                    except:
-                        continue
+                
+                # 电影模式：每个一级目录视为一个电影
+                if mode == "movie" and rel_path != ".":
+                    continue
+                for subdir in subdirs:
+                    todo.put(subdir)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # 子目录在此之前已放入队列，未完成计数不会提前归零
+                todo.task_done()
+    
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    todo.join()
+    for _ in threads:
+        todo.put(None)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    
+    if index is not None:
+        index.save(root_dir, mode, known, scanned, kept)
     
     # 发送完成信号
     progress_queue.put(None)
     return dir_structure
 
-def progress_monitor(progress_queue, source_name):
-    """显示扫描进度 - 仅显示动态图标"""
+def is_snapshot(path):
+    """路径是否为扫描快照文件（目录之外的 gzip 文件）"""
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(2) == b"\x1f\x8b"
+
+def save_snapshot(path, structure, root_dir, mode):
+    """将目录结构保存为快照文件，返回文件数
+    
+    按列存储（目录、文件名、大小、季集/分辨率各一列）并用 gzip 压缩；
+    目录存为 (父目录序号, 名称序号)，目录名和季集/分辨率只在字符串表中保存一次。
+    路径按层级保存，在其他操作系统上读取时使用当地的路径分隔符。
+    """
+    strings = {}
+    dir_ids = {}
+    dirs = []
+    
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+    
+    def dir_id(rel_path):
+        if rel_path not in dir_ids:
+            parent, name = os.path.split(rel_path)
+            parent_id = dir_id(parent) if parent else -1
+            dir_ids[rel_path] = len(dirs)
+            dirs.append([parent_id, intern(name)])
+        return dir_ids[rel_path]
+    
+    columns = {"dir": [], "name": [], "size": [], "key": []}
+    for rel_path in sorted(structure):
+        current = dir_id(rel_path)
+        for filename, size, key in structure[rel_path]:
+            columns["dir"].append(current)
+            columns["name"].append(filename)
+            columns["size"].append(size)
+            columns["key"].append(intern(key))
+    
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "mode": mode,
+        "root": os.path.abspath(root_dir),
+        "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "strings": list(strings),
+        "dirs": dirs,
+        "files": columns
+    }
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(path)), "." + os.path.basename(path) + ".tmp")
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return len(columns["name"])
+
+def load_snapshot(path, mode):
+    """读取快照文件，返回 (目录结构, 快照信息)，格式或模式不符时抛出 ValueError"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"不支持的快照文件: {path}")
+    if snapshot["mode"] != mode:
+        raise ValueError(f"快照为{'剧集' if snapshot['mode'] == 'tv' else '电影'}模式，与比较模式不一致: {path}")
+    
+    strings = snapshot["strings"]
+    dir_paths = []
+    for parent_id, name_id in snapshot["dirs"]:
+        name = strings[name_id]
+        dir_paths.append(os.path.join(dir_paths[parent_id], name) if parent_id >= 0 else name)
+    
+    structure = defaultdict(list)
+    files = snapshot["files"]
+    for dir_index, filename, size, key_id in zip(files["dir"], files["name"], files["size"], files["key"]):
+        structure[dir_paths[dir_index]].append((filename, size, strings[key_id]))
+    return dict(structure), {"root": snapshot["root"], "created": snapshot["created"]}
+
+def scan_sources(sources, mode, index=None, workers=SCAN_WORKERS, failures=None):
+    """同时扫描多个来源 [(名称, 路径)]，返回 {名称: 目录结构}，workers 为每个来源同时读取的目录数
+    
+    路径为快照文件时直接读取快照，不访问原目录。
+    指定 failures（字典）时，各来源读取失败的路径按名称记入其中 {名称: [(相对路径, 错误)]}。
+    """
+    progress_queue = queue.Queue()
+    results = {}
+    if failures is None:
+        failures = {}
+    
+    def scan(name, base):
+        try:
+            if is_snapshot(base):
+                results[name], _ = load_snapshot(base, mode)
+                progress_queue.put(base)
+                progress_queue.put(None)
+            else:
+                failures[name] = []
+                results[name] = get_dir_structure(base, mode, progress_queue, workers, index, failures[name])
+        except Exception as e:
+            # 保证进度显示能结束，异常在主线程中重新抛出
+            results[name] = e
+            progress_queue.put(None)
+    
+    threads = [threading.Thread(target=scan, args=source, daemon=True) for source in sources]
+    for thread in threads:
+        thread.start()
+    progress_monitor(progress_queue, "和".join(name for name, _ in sources), sources=len(threads))
+    for thread in threads:
+        thread.join()
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+def scan_both(base1, base2, mode, index=None, workers=SCAN_WORKERS, failures=None):
+    """同时扫描整理包和媒体库包，返回两边的目录结构"""
+    results = scan_sources([("整理包", base1), ("媒体库包", base2)], mode, index, workers, failures)
+    return results["整理包"], results["媒体库包"]
+
+def report_scan_failures(failures, limit=20):
+    """打印各来源读取失败的路径 {名称: [(相对路径, 错误)]}，返回失败的路径总数"""
+    total = 0
+    for name, failed in failures.items():
+        if not failed:
+            continue
+        total += len(failed)
+        print(f"\n警告: {name}有 {len(failed)} 个目录或文件重试后仍无法读取，其中的视频文件未参与比较:")
+        for path, error in sorted(failed)[:limit]:
+            print(f"  {path}: {error}")
+        if len(failed) > limit:
+            print(f"  ……另有 {len(failed) - limit} 个")
+    return total
+
+def progress_monitor(progress_queue, source_name, sources=1):
+    """显示扫描进度 - 仅显示动态图标，收到 sources 个完成信号后结束"""
     spinner = ['-', '\\', '|', '/']
     spinner_idx = 0
+    finished = 0
     
     print(f"  {source_name}扫描中...", end='', flush=True)
     
@@ -92,7 +632,10 @@ def progress_monitor(progress_queue, source_name):
         try:
             current_dir = progress_queue.get(timeout=0.5)
             if current_dir is None:
-                break
+                finished += 1
+                if finished == sources:
+                    break
+                continue
                 
             # 更新旋转图标
             spinner_idx = (spinner_idx + 1) % 4
@@ -108,267 +651,338 @@ def progress_monitor(progress_queue, source_name):
     sys.stdout.write(f"  ✓ {source_name}扫描完成!\n")
     sys.stdout.flush()
 
-def compare_media(base1, base2, log_file_path, mode):
-    """比较两个目录结构并生成差异报告"""
-    # 创建进度队列
-    progress_queue1 = queue.Queue()
-    progress_queue2 = queue.Queue()
+# 差异记录：type 为记录类型，status 为所在的一边（only_base1 / only_base2 / both / same）或移动类型；
+# 读取失败的路径记为 type 为 scan_error、status 为 base1 / base2 的记录，detail 为错误信息
+DiffRecord = namedtuple("DiffRecord", "type status dir dir2 episode resolution file1 size1 file2 size2 detail",
+                        defaults=(None,) * 9)
+
+# 报告中「一边有、一边无」的文字
+SIDE_LABELS = {"only_base1": "整理包有，媒体库包无", "only_base2": "整理包无，媒体库包有", "both": "整理包有，媒体库包有"}
+
+def one_side_record(type, status, dir_path, filename, size, **fields):
+    """生成只在一边存在的文件的记录，文件放在对应一边的字段中"""
+    if status == "only_base1":
+        return DiffRecord(type, status, dir_path, file1=filename, size1=size, **fields)
+    return DiffRecord(type, status, dir_path, file2=filename, size2=size, **fields)
+
+def group_episodes(files):
+    """按季集分组 {季集: [(文件名, 大小, 分辨率)]}，分辨率只提取一次"""
+    eps = defaultdict(list)
+    for filename, size, ep in files:
+        eps[ep].append((filename, size, extract_resolution(filename)))
+    return eps
+
+def diff_movie_dir(movie_dir, files1, files2, content_diffs, base1, base2):
+    """比较两边都有的电影目录，按分辨率配对"""
+    by_res1 = {resolution: (filename, size) for filename, size, resolution in files1}
+    by_res2 = {resolution: (filename, size) for filename, size, resolution in files2}
+    has_differences = False
     
-    print(f"\n开始扫描整理包: {base1}")
-    # 启动进度监控线程
-    progress_thread1 = threading.Thread(target=progress_monitor, args=(progress_queue1, "整理包"), daemon=True)
-    progress_thread1.start()
+    for status, by_res, other in (("only_base1", by_res1, by_res2), ("only_base2", by_res2, by_res1)):
+        for res, (filename, size) in by_res.items():
+            if res not in other:
+                yield one_side_record("resolution", status, movie_dir, filename, size, resolution=res)
+                has_differences = True
     
-    # 获取目录结构
-    structure1 = get_dir_structure(base1, mode, progress_queue1)
-    progress_thread1.join()
+    for res, (filename1, size1) in by_res1.items():
+        if res not in by_res2:
+            continue
+        filename2, size2 = by_res2[res]
+        if size1 != size2:
+            yield DiffRecord("size_diff", "both", movie_dir, resolution=res,
+                             file1=filename1, size1=size1, file2=filename2, size2=size2)
+            has_differences = True
+            continue
+        reason = content_diffs and content_diffs.get((os.path.join(base1, movie_dir, filename1),
+                                                      os.path.join(base2, movie_dir, filename2)))
+        if reason:
+            yield DiffRecord("content_diff", "both", movie_dir, resolution=res,
+                             file1=filename1, size1=size1, file2=filename2, size2=size2, detail=reason)
+            has_differences = True
     
-    print(f"\n开始扫描媒体库包: {base2}")
-    progress_thread2 = threading.Thread(target=progress_monitor, args=(progress_queue2, "媒体库包"), daemon=True)
-    progress_thread2.start()
-    structure2 = get_dir_structure(base2, mode, progress_queue2)
-    progress_thread2.join()
+    if not has_differences:
+        yield DiffRecord("identical", "both", movie_dir)
+        for filename, size, resolution in files1:
+            yield DiffRecord("file", "same", movie_dir, resolution=resolution, file1=filename, size1=size)
+
+def diff_tv_dir(dir_path, files1, files2, content_diffs, base1, base2):
+    """比较两边都有的剧集目录：季集 → 分辨率 → 文件 逐层用字典查找，不再两两比较"""
+    eps1 = group_episodes(files1)
+    eps2 = group_episodes(files2)
+    has_differences = False
     
-    print("\n开始比较媒体库...")
-    all_items = sorted(set(structure1.keys()) | set(structure2.keys()))
+    # 缺失的季集
+    for status, eps, other in (("only_base1", eps1, eps2), ("only_base2", eps2, eps1)):
+        for ep in sorted(eps.keys() - other.keys()):
+            for filename, size, _ in eps[ep]:
+                yield one_side_record("episode", status, dir_path, filename, size, episode=ep)
+            has_differences = True
     
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
-        # 电影模式比较
-        if mode == "movie":
-            log_file.write(f"===== 电影比较报告 =====\n")
-            log_file.write(f"整理包: {base1}\n")
-            log_file.write(f"媒体库包: {base2}\n")
-            log_file.write(f"生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            for movie_dir in sorted(all_items):
-                files1 = structure1.get(movie_dir, [])
-                files2 = structure2.get(movie_dir, [])
-                
-                # 跳过两边都没有视频文件的目录
-                if not files1 and not files2:
-                    continue
-                    
-                in_base1 = bool(files1)
-                in_base2 = bool(files2)
-                
-                # 输出电影标题
-                if not in_base1 and in_base2:
-                    log_file.write(f"[电影] {movie_dir}（整理包无，媒体库包有）\n")
-                    log_file.write(f"  媒体库包文件列表:\n")
-                    for filename, size, resolution in files2:
-                        log_file.write(f"    ├─ {filename} ({resolution}, {convert_size(size)})\n")
-                    log_file.write("\n")
-                    continue
-                    
-                if in_base1 and not in_base2:
-                    log_file.write(f"[电影] {movie_dir}（整理包有，媒体库包无）\n")
-                    log_file.write(f"  整理包文件列表:\n")
-                    for filename, size, resolution in files1:
-                        log_file.write(f"    ├─ {filename} ({resolution}, {convert_size(size)})\n")
-                    log_file.write("\n")
-                    continue
-                    
-                # 两边都有电影文件
-                log_file.write(f"[电影] {movie_dir}（整理包有，媒体库包有）\n")
-                
-                # 找出所有文件（按分辨率分组）
-                files_by_res = defaultdict(dict)
-                for filename, size, resolution in files1:
-                    files_by_res[resolution]["base1"] = (filename, size)
-                
-                for filename, size, resolution in files2:
-                    if resolution in files_by_res:
-                        files_by_res[resolution]["base2"] = (filename, size)
-                    else:
-                        files_by_res[resolution] = {"base2": (filename, size)}
-                
-                # 比较不同分辨率的文件
-                has_differences = False
-                
-                # 检查整理包独有的分辨率
-                for res, files in files_by_res.items():
-                    if "base1" in files and "base2" not in files:
-                        filename, size = files["base1"]
-                        log_file.write(f"  ├─ [整理包独有] {res}: {filename} ({convert_size(size)})\n")
-                        has_differences = True
-                
-                # 检查媒体库包独有的分辨率
-                for res, files in files_by_res.items():
-                    if "base2" in files and "base1" not in files:
-                        filename, size = files["base2"]
-                        log_file.write(f"  ├─ [媒体库包独有] {res}: {filename} ({convert_size(size)})\n")
-                        has_differences = True
-                
-                # 检查共同分辨率但不同大小
-                for res, files in files_by_res.items():
-                    if "base1" in files and "base2" in files:
-                        filename1, size1 = files["base1"]
-                        filename2, size2 = files["base2"]
-                        
-                        if size1 != size2:
-                            log_file.write(f"  ├─ [大小不同] {res}:\n")
-                            log_file.write(f"      │ 整理包: {filename1} ({convert_size(size1)})\n")
-                            log_file.write(f"      └─ 媒体库包: {filename2} ({convert_size(size2)})\n")
-                            has_differences = True
-                
-                # 如果没有差异，输出无差异信息
-                if not has_differences:
-                    log_file.write(f"  └─ 所有视频文件完全一致\n")
-                    
-                    # 输出文件列表
-                    log_file.write(f"  整理包文件列表:\n")
-                    for filename, size, resolution in files1:
-                        log_file.write(f"    ├─ {filename} ({resolution}, {convert_size(size)})\n")
-                
-                log_file.write("\n")
+    # 共同季集
+    for ep in sorted(eps1.keys() & eps2.keys()):
+        names1 = {(filename, size) for filename, size, _ in eps1[ep]}
+        names2 = {(filename, size) for filename, size, _ in eps2[ep]}
+        by_res2 = defaultdict(list)
+        for filename, size, res in eps2[ep]:
+            by_res2[res].append((filename, size))
+        sizes_by_res1 = defaultdict(set)
+        for _, size, res in eps1[ep]:
+            sizes_by_res1[res].add(size)
         
-        # 剧集模式比较
-        elif mode == "tv":
-            log_file.write(f"===== 剧集比较报告 =====\n")
-            log_file.write(f"整理包: {base1}\n")
-            log_file.write(f"媒体库包: {base2}\n")
-            log_file.write(f"生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            for dir_path in sorted(all_items):
-                files1 = structure1.get(dir_path, [])
-                files2 = structure2.get(dir_path, [])
-                
-                # 跳过两边都没有视频文件的目录
-                if not files1 and not files2:
-                    continue
-                    
-                in_base1 = bool(files1)
-                in_base2 = bool(files2)
-                
-                # 输出目录标题
-                if not in_base1 and in_base2:
-                    log_file.write(f"[目录] {dir_path}（整理包无，媒体库包有）\n")
-                    # 按季集分组输出
-                    eps = defaultdict(list)
-                    for filename, size, ep in files2:
-                        eps[ep].append((filename, size))
-                    
-                    for ep, files in eps.items():
-                        log_file.write(f"  ├─ [集] {ep}\n")
-                        for filename, size in files:
-                            log_file.write(f"  │   └─ {filename} ({convert_size(size)})\n")
-                    log_file.write("\n")
-                    continue
-                    
-                if in_base1 and not in_base2:
-                    log_file.write(f"[目录] {dir_path}（整理包有，媒体库包无）\n")
-                    # 按季集分组输出
-                    eps = defaultdict(list)
-                    for filename, size, ep in files1:
-                        eps[ep].append((filename, size))
-                    
-                    for ep, files in eps.items():
-                        log_file.write(f"  ├─ [集] {ep}\n")
-                        for filename, size in files:
-                            log_file.write(f"  │   └─ {filename} ({convert_size(size)})\n")
-                    log_file.write("\n")
-                    continue
-                    
-                # 目录在两边都存在
-                log_file.write(f"[目录] {dir_path}（整理包有，媒体库包有）\n")
-                
-                # 按季集分组
-                eps1 = defaultdict(list)
-                for filename, size, ep in files1:
-                    eps1[ep].append((filename, size))
-                
-                eps2 = defaultdict(list)
-                for filename, size, ep in files2:  # 修复这里：friends2 -> files2
-                    eps2[ep].append((filename, size))
-                
-                all_eps = sorted(set(eps1.keys()) | set(eps2.keys()))
-                missing_in_base2 = set(eps1.keys()) - set(eps2.keys())
-                missing_in_base1 = set(eps2.keys()) - set(eps1.keys())
-                
-                has_differences = False
-                
-                # 输出缺失的季集
-                for ep in sorted(missing_in_base2):
-                    log_file.write(f"  ├─ [集] {ep}（整理包有，媒体库包无）\n")
-                    for filename, size in eps1[ep]:
-                        log_file.write(f"  │   └─ {filename} ({convert_size(size)})\n")
+        for filename1, size1, res1 in eps1[ep]:
+            if (filename1, size1) in names2:
+                reason = content_diffs and content_diffs.get((os.path.join(base1, dir_path, filename1),
+                                                              os.path.join(base2, dir_path, filename1)))
+                if reason:
+                    yield DiffRecord("content_diff", "both", dir_path, episode=ep, resolution=res1,
+                                     file1=filename1, size1=size1, file2=filename1, size2=size1, detail=reason)
                     has_differences = True
-                
-                for ep in sorted(missing_in_base1):
-                    log_file.write(f"  ├─ [集] {ep}（整理包无，媒体库包有）\n")
-                    for filename, size in eps2[ep]:
-                        log_file.write(f"  │   └─ {filename} ({convert_size(size)})\n")
-                    has_differences = True
-                
-                # 比较共同季集
-                common_eps = set(eps1.keys()) & set(eps2.keys())
-                for ep in sorted(common_eps):
-                    files_ep1 = eps1[ep]
-                    files_ep2 = eps2[ep]
-                    
-                    # 检查文件差异
-                    file_diffs = False
-                    
-                    # 检查文件名和大小差异
-                    for filename1, size1 in files_ep1:
-                        found = False
-                        for filename2, size2 in files_ep2:
-                            if filename1 == filename2 and size1 == size2:
-                                found = True
-                                break
-                        
-                        if not found:
-                            # 检查是否有相同分辨率但大小不同
-                            res1 = extract_resolution(filename1)
-                            same_res_found = False
-                            for filename2, size2 in files_ep2:
-                                res2 = extract_resolution(filename2)
-                                if res1 == res2 and size1 != size2:
-                                    log_file.write(f"  ├─ [集] {ep}（{res1}大小不同）\n")
-                                    log_file.write(f"  │   ├─ 整理包: {filename1} ({convert_size(size1)})\n")
-                                    log_file.write(f"  │   └─ 媒体库包: {filename2} ({convert_size(size2)})\n")
-                                    same_res_found = True
-                                    file_diffs = True
-                                    break
-                            
-                            if not same_res_found:
-                                log_file.write(f"  ├─ [集] {ep}（整理包独有文件）\n")
-                                log_file.write(f"  │   └─ {filename1} ({convert_size(size1)})\n")
-                                file_diffs = True
-                    
-                    # 检查媒体库包独有的文件
-                    for filename2, size2 in files_ep2:
-                        found = False
-                        for filename1, size1 in files_ep1:
-                            if filename2 == filename1 and size2 == size1:
-                                found = True
-                                break
-                        
-                        if not found:
-                            # 检查是否有相同分辨率但大小不同（已处理过）
-                            res2 = extract_resolution(filename2)
-                            same_res_found = False
-                            for filename1, size1 in files_ep1:
-                                res1 = extract_resolution(filename1)
-                                if res1 == res2 and size1 != size2:
-                                    same_res_found = True
-                                    break
-                            
-                            if not same_res_found:
-                                log_file.write(f"  ├─ [集] {ep}（媒体库包独有文件）\n")
-                                log_file.write(f"  │   └─ {filename2} ({convert_size(size2)})\n")
-                                file_diffs = True
-                    
-                    if file_diffs:
-                        has_differences = True
-                
-                # 如果没有差异，输出无差异信息
-                if not has_differences:
-                    log_file.write(f"  └─ 所有季集文件完全一致\n")
-                
-                log_file.write("\n")
+                continue
+            
+            # 相同分辨率但大小不同
+            other = next(((filename2, size2) for filename2, size2 in by_res2[res1] if size2 != size1), None)
+            if other:
+                yield DiffRecord("size_diff", "both", dir_path, episode=ep, resolution=res1,
+                                 file1=filename1, size1=size1, file2=other[0], size2=other[1])
+            else:
+                yield one_side_record("extra_file", "only_base1", dir_path, filename1, size1, episode=ep, resolution=res1)
+            has_differences = True
+        
+        # 媒体库包独有的文件（相同分辨率大小不同的已在上面输出）
+        for filename2, size2, res2 in eps2[ep]:
+            if (filename2, size2) not in names1 and not sizes_by_res1[res2] - {size2}:
+                yield one_side_record("extra_file", "only_base2", dir_path, filename2, size2, episode=ep, resolution=res2)
+                has_differences = True
+    
+    if not has_differences:
+        yield DiffRecord("identical", "both", dir_path)
+
+def diff_records(structure1, structure2, mode, moves=(), content_diffs=None, base1="", base2="", failures=None):
+    """逐条生成差异记录：先是读取失败的路径和移动或改名的文件，然后按目录顺序输出各目录的差异
+    
+    failures 为两边读取失败的路径 {"base1" / "base2": [(相对路径, 错误)]}
+    """
+    content_diffs = content_diffs or {}
+    for side, failed in sorted((failures or {}).items()):
+        for path, error in sorted(failed):
+            yield DiffRecord("scan_error", side, path, detail=error)
+    for dir1, filename1, dir2, filename2, size in sorted(moves, key=lambda move: (move[0], move[2])):
+        yield DiffRecord("move", "moved" if filename1 == filename2 else "renamed", dir1, dir2,
+                         file1=filename1, size1=size, file2=filename2, size2=size)
+    
+    for dir_path in sorted(structure1.keys() | structure2.keys()):
+        files1 = structure1.get(dir_path, [])
+        files2 = structure2.get(dir_path, [])
+        
+        # 跳过两边都没有视频文件的目录
+        if not files1 and not files2:
+            continue
+        
+        # 只有一边有
+        if not files1 or not files2:
+            status = "only_base1" if files1 else "only_base2"
+            yield DiffRecord("dir", status, dir_path)
+            if mode == "movie":
+                for filename, size, resolution in files1 or files2:
+                    yield one_side_record("file", status, dir_path, filename, size, resolution=resolution)
+            else:
+                for ep, files in group_episodes(files1 or files2).items():
+                    for filename, size, resolution in files:
+                        yield one_side_record("file", status, dir_path, filename, size, episode=ep, resolution=resolution)
+            continue
+        
+        yield DiffRecord("dir", "both", dir_path)
+        if mode == "movie":
+            yield from diff_movie_dir(dir_path, files1, files2, content_diffs, base1, base2)
+        else:
+            yield from diff_tv_dir(dir_path, files1, files2, content_diffs, base1, base2)
+
+class LogSink:
+    """按文本报告格式逐条写出差异记录"""
+    def __init__(self, path, mode, base1, base2):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.mode = mode
+        self.dir_status = None
+        self.episode = None
+        self.move_dirs = None
+        self.in_moves = False
+        self.in_errors = False
+        
+        self.file.write(f"===== {'电影' if mode == 'movie' else '剧集'}比较报告 =====\n")
+        self.file.write(f"整理包: {base1}\n")
+        self.file.write(f"媒体库包: {base2}\n")
+        self.file.write(f"生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    
+    def write(self, record):
+        f = self.file
+        r = record
+        if r.type == "scan_error":
+            if not self.in_errors:
+                f.write(f"===== 读取失败（以下路径中的文件未参与比较，结果不完整）=====\n\n")
+                self.in_errors = True
+            f.write(f"[{'整理包' if r.status == 'base1' else '媒体库包'}] {r.dir}: {r.detail}\n")
+            return
+        if self.in_errors:
+            self.file.write("\n")
+            self.in_errors = False
+        if r.type == "move":
+            if not self.in_moves:
+                f.write(f"===== 移动或改名（整理包 → 媒体库包）=====\n\n")
+                self.in_moves = True
+            if (r.dir, r.dir2) != self.move_dirs:
+                if self.move_dirs is not None:
+                    f.write("\n")
+                self.move_dirs = (r.dir, r.dir2)
+                f.write(f"[移动] {r.dir} → {r.dir2}\n" if r.dir != r.dir2 else f"[改名] {r.dir}\n")
+            if r.status == "moved":
+                f.write(f"  ├─ {r.file1} ({convert_size(r.size1)})\n")
+            else:
+                f.write(f"  ├─ [改名] {r.file1} → {r.file2} ({convert_size(r.size1)})\n")
+            return
+        
+        self.end_moves()
+        name, size = (r.file1, r.size1) if r.file1 is not None else (r.file2, r.size2)
+        if r.type == "dir":
+            if self.dir_status is not None:
+                f.write("\n")
+            self.dir_status = r.status
+            self.episode = None
+            if self.mode == "movie":
+                f.write(f"[电影] {r.dir}（{SIDE_LABELS[r.status]}）\n")
+                if r.status != "both":
+                    f.write(f"  {'整理包' if r.status == 'only_base1' else '媒体库包'}文件列表:\n")
+            else:
+                f.write(f"[目录] {r.dir}（{SIDE_LABELS[r.status]}）\n")
+        elif r.type == "file" and self.mode == "movie":
+            f.write(f"    ├─ {name} ({r.resolution}, {convert_size(size)})\n")
+        elif r.type in ("file", "episode"):
+            if r.episode != self.episode:
+                self.episode = r.episode
+                suffix = f"（{SIDE_LABELS[r.status]}）" if r.type == "episode" else ""
+                f.write(f"  ├─ [集] {r.episode}{suffix}\n")
+            f.write(f"  │   └─ {name} ({convert_size(size)})\n")
+        elif r.type == "resolution":
+            f.write(f"  ├─ [{'整理包独有' if r.status == 'only_base1' else '媒体库包独有'}] {r.resolution}: {name} ({convert_size(size)})\n")
+        elif r.type == "extra_file":
+            f.write(f"  ├─ [集] {r.episode}（{'整理包独有文件' if r.status == 'only_base1' else '媒体库包独有文件'}）\n")
+            f.write(f"  │   └─ {name} ({convert_size(size)})\n")
+        elif r.type in ("size_diff", "content_diff") and self.mode == "movie":
+            label = "[大小不同] " if r.type == "size_diff" else "[内容不同] "
+            detail = f"（{r.detail}）" if r.type == "content_diff" else ""
+            f.write(f"  ├─ {label}{r.resolution}{detail}:\n")
+            f.write(f"      │ 整理包: {r.file1} ({convert_size(r.size1)})\n")
+            f.write(f"      └─ 媒体库包: {r.file2} ({convert_size(r.size2)})\n")
+        elif r.type == "size_diff":
+            f.write(f"  ├─ [集] {r.episode}（{r.resolution}大小不同）\n")
+            f.write(f"  │   ├─ 整理包: {r.file1} ({convert_size(r.size1)})\n")
+            f.write(f"  │   └─ 媒体库包: {r.file2} ({convert_size(r.size2)})\n")
+        elif r.type == "content_diff":
+            f.write(f"  ├─ [集] {r.episode}（内容不同，{r.detail}）\n")
+            f.write(f"  │   └─ {r.file1} ({convert_size(r.size1)})\n")
+        elif r.type == "identical":
+            if self.mode == "movie":
+                f.write(f"  └─ 所有视频文件完全一致\n")
+                f.write(f"  整理包文件列表:\n")
+            else:
+                f.write(f"  └─ 所有季集文件完全一致\n")
+    
+    def end_moves(self):
+        if self.in_moves:
+            self.file.write(f"\n===== 其他差异 =====\n\n")
+            self.in_moves = False
     
-    print(f"\n比较完成! 结果已保存到: {log_file_path}")
+    def close(self):
+        self.end_moves()
+        if self.in_errors or self.dir_status is not None:
+            self.file.write("\n")
+        self.file.close()
+
+class JsonlSink:
+    """每条差异记录写成一行 JSON"""
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+    
+    def write(self, record):
+        self.file.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+    
+    def close(self):
+        self.file.close()
+
+class CsvSink:
+    """差异记录写成 CSV，列与 DiffRecord 的字段一致"""
+    def __init__(self, path):
+        # utf-8-sig 便于 Excel 直接打开中文内容
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(DiffRecord._fields)
+    
+    def write(self, record):
+        self.writer.writerow(record)
+    
+    def close(self):
+        self.file.close()
+
+def compare_media(base1, base2, log_file_path, mode, index_path=None, fingerprint=False, verify=False,
+                  jsonl_path=None, csv_path=None, io_workers=SCAN_WORKERS):
+    """比较两个目录结构并生成差异报告
+    
+    index_path 为扫描索引文件，指定后只重新读取有变化的目录，抽样指纹也缓存在其中
+    fingerprint 为真时比较名称和大小都相同的文件的抽样指纹，verify 为真时对指纹不同的文件完整校验
+    差异记录逐条写入文本报告（log_file_path）、JSON Lines（jsonl_path）和 CSV（csv_path），不在内存中累积
+    io_workers 为每边同时读取的目录数，网络共享上可以调大
+    base1、base2 也可以是快照文件（见 save_snapshot），快照一边不访问原目录
+    返回重试后仍无法读取的路径数，这些路径也作为 scan_error 记录写在报告开头
+    """
+    if fingerprint and (is_snapshot(base1) or is_snapshot(base2)):
+        raise ValueError("快照不包含文件内容，不能与内容指纹一起使用")
+    
+    print(f"\n开始扫描整理包: {base1}")
+    print(f"开始扫描媒体库包: {base2}")
+    # 两边同时扫描
+    index = ScanIndex(index_path) if index_path else None
+    failures = {}
+    try:
+        structure1, structure2 = scan_both(base1, base2, mode, index, io_workers, failures)
+    finally:
+        if index is not None:
+            index.close()
+    failed = report_scan_failures(failures)
+    
+    print("\n开始比较媒体库...")
+    content_diffs = {}
+    cache = FingerprintCache(index_path) if fingerprint and index_path else None
+    try:
+        # 先找出移动或改名的文件，不再作为一边有、一边无报告
+        moves, structure1, structure2 = detect_moves(structure1, structure2, base1, base2, mode, fingerprint, cache)
+        if moves:
+            print(f"  移动或改名: {len(moves)} 个文件")
+        if fingerprint:
+            content_diffs = check_content(same_size_pairs(structure1, structure2, base1, base2, mode), cache, verify)
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    sinks = []
+    try:
+        if log_file_path:
+            sinks.append(LogSink(log_file_path, mode, base1, base2))
+        if jsonl_path:
+            sinks.append(JsonlSink(jsonl_path))
+        if csv_path:
+            sinks.append(CsvSink(csv_path))
+        side_failures = {"base1": failures.get("整理包", []), "base2": failures.get("媒体库包", [])}
+        for record in diff_records(structure1, structure2, mode, moves, content_diffs, base1, base2, side_failures):
+            for sink in sinks:
+                sink.write(record)
+    finally:
+        for sink in sinks:
+            sink.close()
+    
+    outputs = [path for path in (log_file_path, jsonl_path, csv_path) if path]
+    print(f"\n比较完成! 结果已保存到: {', '.join(outputs)}")
+    if failed:
+        print(f"注意: {failed} 个路径读取失败，比较结果不完整")
+    return failed
 
 def get_input(prompt, default=None):
     """获取用户输入，支持默认值"""
@@ -420,21 +1034,97 @@ def main():
     
     log_file_path = os.path.join(log_dir, log_filename)
     
+    index_path = get_input("扫描索引文件 (留空为不使用，再次比较时只重新扫描有变化的目录): ")
+    fingerprint = get_input("比较名称和大小相同的文件的内容指纹 (y/N): ").lower() == "y"
+    verify = fingerprint and get_input("对指纹不同的文件完整读取校验 (y/N): ").lower() == "y"
+    
     print("\n" + "=" * 60)
     print(f"即将开始比较:")
     print(f"  模式: {'剧集' if mode=='tv' else '电影'}")
     print(f"  整理包: {base1}")
     print(f"  媒体库包: {base2}")
     print(f"  日志文件: {log_file_path}")
+    if index_path:
+        print(f"  扫描索引: {index_path}")
+    if fingerprint:
+        print(f"  内容指纹: 开启{'（完整校验）' if verify else ''}")
     print("=" * 60)
     
     input("\n按 Enter 键开始比较...")
     
-    compare_media(base1, base2, log_file_path, mode)
+    compare_media(base1, base2, log_file_path, mode, index_path or None, fingerprint, verify)
+
+def main_cli(argv):
+    """非交互方式运行，供定时任务和其他工具调用"""
+    parser = argparse.ArgumentParser(description="媒体库比较工具（不带参数运行时进入交互模式）",
+                                     epilog="用 'media_compare.py snapshot 目录 快照文件 --mode tv' 保存扫描快照")
+    parser.add_argument("base1", help="整理包路径或快照文件")
+    parser.add_argument("base2", help="媒体库包路径或快照文件")
+    parser.add_argument("--mode", choices=["tv", "movie"], required=True, help="比较模式：tv 剧集，movie 电影")
+    parser.add_argument("--log", default="", help="文本报告输出路径")
+    parser.add_argument("--jsonl", default="", help="JSON Lines 输出路径，每行一条差异记录")
+    parser.add_argument("--csv", default="", help="CSV 输出路径，每行一条差异记录")
+    parser.add_argument("--index", default="", help="扫描索引文件，再次比较时只重新扫描有变化的目录")
+    parser.add_argument("--fingerprint", action="store_true", help="比较名称和大小相同的文件的抽样内容指纹")
+    parser.add_argument("--verify", action="store_true", help="对指纹不同的文件完整读取校验（需要 --fingerprint）")
+    parser.add_argument("--io-workers", type=int, default=SCAN_WORKERS,
+                        help=f"每边同时读取的目录数，NFS/SMB 等网络共享上可调大到 32~64 (默认{SCAN_WORKERS})")
+    args = parser.parse_args(argv)
+    
+    for path in (args.base1, args.base2):
+        if not os.path.exists(path):
+            parser.error(f"路径不存在 - {path}")
+    if args.verify and not args.fingerprint:
+        parser.error("--verify 需要同时指定 --fingerprint")
+    if args.fingerprint and (is_snapshot(args.base1) or is_snapshot(args.base2)):
+        parser.error("快照不包含文件内容，不能与 --fingerprint 一起使用")
+    if not (args.log or args.jsonl or args.csv):
+        parser.error("至少指定 --log、--jsonl、--csv 之一")
+    
+    failed = compare_media(args.base1, args.base2, args.log or None, args.mode, args.index or None,
+                           args.fingerprint, args.verify, args.jsonl or None, args.csv or None, args.io_workers)
+    if failed:
+        sys.exit(1)
+
+def main_snapshot(argv):
+    """media_compare.py snapshot：扫描一个目录并保存为快照，快照可拿到其他机器上比较"""
+    parser = argparse.ArgumentParser(prog="media_compare.py snapshot", description="扫描目录并保存为快照文件")
+    parser.add_argument("root", help="要扫描的目录")
+    parser.add_argument("output", help=f"快照文件路径（建议以 {SNAPSHOT_SUFFIX} 结尾）")
+    parser.add_argument("--mode", choices=["tv", "movie"], required=True, help="比较模式：tv 剧集，movie 电影")
+    parser.add_argument("--index", default="", help="扫描索引文件，再次生成快照时只重新扫描有变化的目录")
+    parser.add_argument("--io-workers", type=int, default=SCAN_WORKERS,
+                        help=f"同时读取的目录数，NFS/SMB 等网络共享上可调大到 32~64 (默认{SCAN_WORKERS})")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.root):
+        parser.error(f"目录不存在 - {args.root}")
+    
+    print(f"\n开始扫描: {args.root}")
+    index = ScanIndex(args.index) if args.index else None
+    failures = {}
+    try:
+        structure = scan_sources([("目录", args.root)], args.mode, index, args.io_workers, failures)["目录"]
+    finally:
+        if index is not None:
+            index.close()
+    failed = report_scan_failures(failures)
+    
+    files = save_snapshot(args.output, structure, args.root, args.mode)
+    print(f"\n快照已保存: {args.output}（{len(structure)} 个目录，{files} 个视频文件，"
+          f"{convert_size(os.path.getsize(args.output))}）")
+    if failed:
+        print(f"注意: {failed} 个路径读取失败，快照不完整")
+        sys.exit(1)
 
 if __name__ == "__main__":
     try:
-        main()
+        if sys.argv[1:2] == ["snapshot"]:
+            main_snapshot(sys.argv[2:])
+        elif len(sys.argv) > 1:
+            main_cli(sys.argv[1:])
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n操作已取消")
         sys.exit(0)
@@ -0,0 +1,161 @@
+import argparse
+import errno
+import json
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import media_compare
+
+
+def build_tree(root: str, shows: int, seasons: int, episodes: int):
+    """生成剧集目录树：每集一个稀疏视频文件，另带一个非视频文件"""
+    for show in range(shows):
+        for season in range(1, seasons + 1):
+            folder = os.path.join(root, f"Show {show}", f"Season {season}")
+            os.makedirs(folder, exist_ok=True)
+            for episode in range(1, episodes + 1):
+                with open(os.path.join(folder, f"Show.{show}.S{season:02d}E{episode:02d}.1080p.mkv"), "wb") as f:
+                    f.truncate(1000 + episode)
+            with open(os.path.join(folder, "poster.jpg"), "wb") as f:
+                f.truncate(10)
+
+
+class SlowEntry:
+    """目录项包装：stat 与 SlowOS 的调用一样有延迟"""
+    def __init__(self, fs: "SlowOS", entry: os.DirEntry):
+        self.fs = fs
+        self.entry = entry
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self.entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self.entry.is_file(follow_symlinks=follow_symlinks)
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        self.fs.round_trip()
+        return self.entry.stat(follow_symlinks=follow_symlinks)
+
+
+class SlowScandir:
+    def __init__(self, fs: "SlowOS", iterator):
+        self.fs = fs
+        self.iterator = iterator
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.iterator.close()
+
+    def __iter__(self):
+        for entry in self.iterator:
+            yield SlowEntry(self.fs, entry)
+
+
+class SlowOS:
+    """替换 media_compare 使用的 os 模块，模拟网络共享：scandir 和 stat 每次调用都有往返延迟，
+    并按概率抛出超时错误（临时错误，media_compare 会重试）"""
+    def __init__(self, latency: float, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+    def round_trip(self):
+        with self.lock:
+            self.calls += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        if fail:
+            raise OSError(errno.ETIMEDOUT, "模拟网络超时")
+
+    def scandir(self, path):
+        self.round_trip()
+        return SlowScandir(self, os.scandir(path))
+
+    def stat(self, path, *args, **kwargs):
+        self.round_trip()
+        return os.stat(path, *args, **kwargs)
+
+
+def run_scan(root: str, workers: int, fs: SlowOS) -> Dict:
+    """用模拟的网络文件系统扫描一次，返回耗时和调用次数"""
+    media_compare.os = fs
+    started = time.perf_counter()
+    try:
+        structure = media_compare.get_dir_structure(root, "tv", queue.Queue(), workers)
+    finally:
+        media_compare.os = os
+    wall = time.perf_counter() - started
+    return {"workers": workers, "wall_s": round(wall, 3), "calls": fs.calls, "errors": fs.errors,
+            "calls_per_s": round(fs.calls / wall, 1) if wall else None, "structure": structure}
+
+
+def print_report(results: List[Dict]):
+    """输出基准测试结果表格"""
+    header = f"{'并发':>6}{'耗时(s)':>10}{'调用数':>8}{'调用/s':>10}{'注入错误':>10}{'加速比':>8}  结果"
+    print(header)
+    print("-" * (len(header) + 8))
+    for r in results:
+        print(f"{r['workers']:>6}{r['wall_s']:>10.2f}{r['calls']:>8}{r['calls_per_s'] or 0:>10.1f}"
+              f"{r['errors']:>10}{r['speedup']:>8.1f}  {'一致' if r['consistent'] else '不一致'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="媒体库扫描基准测试（模拟 NFS/SMB 的每次调用延迟）")
+    parser.add_argument("--io-workers", type=str, default="1,8,32,64", help="要测试的并发数，逗号分隔 (默认1,8,32,64)")
+    parser.add_argument("--shows", type=int, default=30, help="剧集数 (默认30)")
+    parser.add_argument("--seasons", type=int, default=3, help="每部剧集的季数 (默认3)")
+    parser.add_argument("--episodes", type=int, default=10, help="每季集数 (默认10)")
+    parser.add_argument("--latency", type=float, default=0.005, help="每次 scandir/stat 的固定延迟，秒 (默认0.005)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限，秒")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="调用返回超时错误的概率 (0~1)")
+    parser.add_argument("--retry-delay", type=float, default=0.01,
+                        help=f"临时错误的首次重试间隔，秒 (默认0.01，实际扫描为{media_compare.SCAN_RETRY_DELAY})")
+    parser.add_argument("--seed", type=int, default=0, help="错误注入的随机种子")
+    parser.add_argument("--json", type=str, default="", help="将结果另存为 JSON 文件")
+    args = parser.parse_args()
+
+    media_compare.SCAN_RETRY_DELAY = args.retry_delay
+    root = tempfile.mkdtemp(prefix="media_compare_bench_")
+    try:
+        build_tree(root, args.shows, args.seasons, args.episodes)
+        expected = media_compare.get_dir_structure(root, "tv", queue.Queue())
+
+        results = []
+        for workers in [int(n) for n in args.io_workers.split(",") if n]:
+            fs = SlowOS(args.latency, args.jitter, args.error_rate, args.seed)
+            results.append(run_scan(root, workers, fs))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    for r in results:
+        r["consistent"] = r.pop("structure") == expected
+        r["speedup"] = results[0]["wall_s"] / r["wall_s"] if r["wall_s"] else 0
+    print(f"目录树: {args.shows} 部剧集 x {args.seasons} 季 x {args.episodes} 集，每次调用延迟 {args.latency * 1000:.1f}ms")
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
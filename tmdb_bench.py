@@ -0,0 +1,552 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional, List, Tuple
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import resource
+except ImportError:  # Windows 下无法统计峰值内存
+    resource = None
+
+import tmdb_export
+
+# 基准场景：{名称: (剧集 ID, 季数, 每季集数)}
+SCENARIOS = {
+    "small": (1001, 2, 10),
+    "medium": (1002, 5, 24),
+    "large": (1003, 10, 100)
+}
+
+MOVIE_ID = 2001
+COLLECTION_ID = 3001
+
+# 各子资源的路径模式
+OBJECT_PATTERNS = [
+    ("episode", re.compile(r"^/3/tv/(\d+)/season/(\d+)/episode/(\d+)$")),
+    ("season", re.compile(r"^/3/tv/(\d+)/season/(\d+)$")),
+    ("series", re.compile(r"^/3/tv/(\d+)$")),
+    ("movie", re.compile(r"^/3/movie/(\d+)$")),
+    ("collection", re.compile(r"^/3/collection/(\d+)$"))
+]
+
+
+def person(person_id: int, **extra) -> Dict:
+    """生成一条演职员数据"""
+    return {
+        "id": person_id,
+        "name": f"Person {person_id}",
+        "original_name": f"Person {person_id}",
+        "gender": person_id % 3,
+        "known_for_department": "Acting",
+        "popularity": round(person_id % 100 / 3, 3),
+        "profile_path": f"/profile{person_id}.jpg",
+        "credit_id": f"credit{person_id:020d}",
+        **extra
+    }
+
+
+class SyntheticFixtures:
+    """按规则生成 TMDB 风格的响应
+    
+    Args:
+        shows: 剧集结构 {剧集 ID: (季数, 每季集数)}
+        cast_size: 每个对象的演员数量
+        crew_size: 每个对象的职员数量
+    """
+    def __init__(self, shows: Dict[int, Tuple[int, int]], cast_size: int = 20, crew_size: int = 40):
+        self.shows = shows
+        self.cast_size = cast_size
+        self.crew_size = crew_size
+    
+    def credits(self, seed: int, guest_stars: int = 0) -> Dict:
+        data = {
+            "cast": [person(seed * 1000 + i, character=f"Role {i}", order=i) for i in range(self.cast_size)],
+            "crew": [person(seed * 1000 + 500 + i, job="Director" if i == 0 else "Writer",
+                            department="Directing") for i in range(self.crew_size)]
+        }
+        if guest_stars:
+            data["guest_stars"] = [person(seed * 1000 + 900 + i, character=f"Guest {i}") for i in range(guest_stars)]
+        return data
+    
+    @staticmethod
+    def videos(seed: int) -> Dict:
+        return {"results": [{"id": f"video{seed}", "key": f"key{seed}", "site": "YouTube", "type": "Trailer"},
+                            {"id": f"video{seed}v", "key": f"vkey{seed}", "site": "Vimeo", "type": "Teaser"}]}
+    
+    def episode(self, tv_id: int, season: int, episode: int) -> Dict:
+        seed = tv_id * 10000 + season * 100 + episode
+        return {
+            "id": seed,
+            "name": f"第 {episode} 集",
+            "overview": f"剧集 {tv_id} 第 {season} 季第 {episode} 集简介。" * 3,
+            "air_date": f"2020-{season % 12 + 1:02d}-{episode % 28 + 1:02d}",
+            "episode_number": episode,
+            "season_number": season,
+            "vote_average": 7.5,
+            "vote_count": 100,
+            "runtime": 45,
+            "still_path": f"/still{seed}.jpg",
+            "crew": self.credits(seed)["crew"][:5],
+            "guest_stars": self.credits(seed, guest_stars=5)["guest_stars"]
+        }
+    
+    def sub_resource(self, kind: str, name: str, seed: int) -> Optional[Dict]:
+        """对象的子资源，不存在时返回 None"""
+        if name == "credits":
+            return self.credits(seed, guest_stars=5 if kind == "episode" else 0)
+        if name == "external_ids":
+            return {"imdb_id": f"tt{seed:07d}", "tvdb_id": seed, "tvrage_id": None}
+        if name == "videos":
+            return self.videos(seed)
+        if name == "content_ratings" and kind == "series":
+            return {"results": [{"iso_3166_1": "US", "rating": "TV-14"}]}
+        if name == "release_dates" and kind == "movie":
+            return {"results": [{"iso_3166_1": "US", "release_dates": [{"certification": "PG-13", "type": 3}]}]}
+        if name == "changes" and kind in ("series", "movie"):
+            return {"changes": []}
+        if name == "translations" and kind in ("series", "movie", "collection"):
+            return {"translations": [{"iso_639_1": "en", "iso_3166_1": "US", "english_name": "English",
+                                      "data": {"name": f"Object {seed}", "title": f"Object {seed}",
+                                               "overview": f"Overview {seed}", "tagline": f"Tagline {seed}"}}]}
+        return None
+    
+    def object(self, kind: str, ids: Tuple[int, ...]) -> Optional[Dict]:
+        """对象本身的数据，不存在时返回 None"""
+        if kind == "movie":
+            if ids[0] != MOVIE_ID:
+                return None
+            return {"id": MOVIE_ID, "title": "测试电影", "original_title": "Test Movie",
+                    "overview": "测试电影简介", "tagline": None, "release_date": "2020-01-01",
+                    "vote_average": 8.0, "genres": [{"id": 18, "name": "剧情"}],
+                    "poster_path": "/movie.jpg", "backdrop_path": "/movie_bg.jpg",
+                    "belongs_to_collection": {"id": COLLECTION_ID, "name": "测试合集"}}
+        if kind == "collection":
+            if ids[0] != COLLECTION_ID:
+                return None
+            return {"id": COLLECTION_ID, "name": "测试合集", "overview": "",
+                    "parts": [{"id": MOVIE_ID, "title": "测试电影"}]}
+        
+        tv_id = ids[0]
+        if tv_id not in self.shows:
+            return None
+        season_count, episode_count = self.shows[tv_id]
+        if kind == "series":
+            return {"id": tv_id, "name": f"测试剧集 {tv_id}", "original_name": f"Test Show {tv_id}",
+                    "overview": "测试剧集简介", "vote_average": 8.2, "episode_run_time": [45],
+                    "first_air_date": "2020-01-01", "last_air_date": "2024-01-01", "status": "Ended",
+                    "networks": [{"id": 1, "name": "Network"}], "genres": [{"id": 18, "name": "剧情"}],
+                    "poster_path": f"/tv{tv_id}.jpg", "backdrop_path": f"/tv{tv_id}_bg.jpg",
+                    "seasons": [{"season_number": n, "episode_count": episode_count if n else 2,
+                                 "air_date": "2020-01-01", "name": f"第 {n} 季", "poster_path": f"/s{n}.jpg"}
+                                for n in range(0, season_count + 1)]}
+        
+        season = ids[1]
+        if not 0 <= season <= season_count:
+            return None
+        if kind == "season":
+            return {"id": tv_id * 100 + season, "name": f"第 {season} 季", "overview": "",
+                    "air_date": "2020-01-01", "season_number": season, "poster_path": f"/s{season}.jpg",
+                    "episodes": [self.episode(tv_id, season, e) for e in range(1, episode_count + 1)]}
+        
+        episode = ids[2]
+        if not 1 <= episode <= episode_count:
+            return None
+        return self.episode(tv_id, season, episode)
+
+
+class RecordedFixtures(SyntheticFixtures):
+    """优先回放录制的响应，目录中不存在的路径再按规则生成
+    
+    录制文件按 API 路径存放，例如 ``{fixtures_dir}/tv/1399.json``、
+    ``{fixtures_dir}/tv/1399/season/1/credits.json``
+    """
+    def __init__(self, fixtures_dir: str, shows: Dict[int, Tuple[int, int]], **kwargs):
+        super().__init__(shows, **kwargs)
+        self.fixtures_dir = fixtures_dir
+    
+    def load(self, path: str) -> Optional[Dict]:
+        file_path = os.path.join(self.fixtures_dir, path.lstrip("/") + ".json")
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+class FakeTMDBServer:
+    """本地 TMDB 模拟服务，支持 append_to_response、ETag 以及延迟和错误注入
+    
+    Args:
+        fixtures: 响应数据来源
+        latency: 每个请求的固定延迟（秒）
+        jitter: 在固定延迟上叠加的随机延迟上限（秒）
+        rate_429: 返回 429（带 Retry-After）的概率
+        rate_5xx: 返回 503 的概率
+        retry_after: 429 响应的 Retry-After 秒数
+        capacity: 同时处理的请求数上限，超出时返回 503（模拟随负载出现的过载），0 为不限
+        server_rate: 服务端限速（请求/秒），超出时返回 429 和到下个令牌可用的 Retry-After，0 为不限
+        seed: 随机种子，保证错误注入可复现
+    """
+    def __init__(self, fixtures: SyntheticFixtures, latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, retry_after: int = 1,
+                 capacity: int = 0, server_rate: float = 0.0, seed: int = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.capacity = capacity
+        self.in_flight = 0
+        self.server_rate = server_rate
+        self.tokens = server_rate
+        self.tokens_updated = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes": 0, "status": {}}
+        # 生成的响应按完整请求路径缓存，避免模拟服务自身成为瓶颈
+        self.bodies: Dict[str, Optional[bytes]] = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/3"
+    
+    def start(self) -> "FakeTMDBServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def snapshot(self) -> Dict:
+        """当前统计数据的副本"""
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+    
+    def resolve(self, path: str, query: Dict[str, List[str]]) -> Optional[Dict]:
+        """按路径生成响应，支持 append_to_response，不存在时返回 None"""
+        if isinstance(self.fixtures, RecordedFixtures):
+            recorded = self.fixtures.load(path[len("/3"):])
+            if recorded is not None:
+                return self._append(recorded, path, query)
+        
+        for kind, pattern in OBJECT_PATTERNS:
+            match = pattern.match(path)
+            if match:
+                data = self.fixtures.object(kind, tuple(int(g) for g in match.groups()))
+                return None if data is None else self._append(data, path, query)
+        
+        # 子资源端点，如 /3/tv/1/season/1/credits
+        parent, _, name = path.rpartition("/")
+        for kind, pattern in OBJECT_PATTERNS:
+            match = pattern.match(parent)
+            if match:
+                ids = tuple(int(g) for g in match.groups())
+                if self.fixtures.object(kind, ids) is None:
+                    return None
+                return self.fixtures.sub_resource(kind, name, sum(ids))
+        return None
+    
+    def body(self, path: str, query: Dict[str, List[str]]) -> Optional[bytes]:
+        """响应体（已编码的 JSON），不存在时返回 None"""
+        query = {k: v for k, v in query.items() if k not in ("api_key", "language")}
+        key = path + "?" + json.dumps(sorted(query.items()))
+        if key not in self.bodies:
+            data = self.resolve(path, query)
+            self.bodies[key] = None if data is None else json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return self.bodies[key]
+    
+    def warm(self, tv_id: int):
+        """预先生成剧集所有对象的响应（含导出器使用的 append_to_response 组合），不计入基准耗时"""
+        season_count, episode_count = self.fixtures.shows[tv_id]
+        paths = [("series", f"/3/tv/{tv_id}")]
+        for season in range(0, season_count + 1):
+            paths.append(("season", f"/3/tv/{tv_id}/season/{season}"))
+            for episode in range(1, episode_count + 1):
+                paths.append(("episode", f"/3/tv/{tv_id}/season/{season}/episode/{episode}"))
+        for kind, path in paths:
+            appends = tmdb_export.append_params(kind) or {}
+            self.body(path, {})
+            self.body(path, {k: [v] for k, v in appends.items()})
+    
+    def _append(self, data: Dict, path: str, query: Dict[str, List[str]]) -> Dict:
+        appends = query.get("append_to_response", [""])[0]
+        for name in filter(None, appends.split(",")):
+            sub = self.resolve(f"{path}/{name}", {})
+            if sub is not None:
+                data[name] = sub
+        return data
+    
+    def take_token(self) -> Optional[float]:
+        """服务端令牌桶（调用方持有锁），有令牌返回 None，否则返回距下个令牌的秒数"""
+        if not self.server_rate:
+            return None
+        now = time.monotonic()
+        self.tokens = min(self.server_rate, self.tokens + (now - self.tokens_updated) * self.server_rate)
+        self.tokens_updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.server_rate
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和响应体分两次写出，关闭 Nagle 以免与客户端的延迟 ACK 叠加出 40ms 停顿
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def send(self, status: int, body: bytes = b"", headers: Optional[Dict] = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server.lock:
+                    server.stats["requests"] += 1
+                    server.stats["bytes"] += len(body)
+                    key = str(status)
+                    server.stats["status"][key] = server.stats["status"].get(key, 0) + 1
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                with server.lock:
+                    delay = server.latency + server.random.uniform(0, server.jitter)
+                    roll = server.random.random()
+                    overloaded = bool(server.capacity) and server.in_flight >= server.capacity
+                    server.in_flight += 1
+                    throttled = server.take_token()
+                try:
+                    if delay:
+                        time.sleep(delay)
+                    self.respond(url, roll, overloaded, throttled)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+            
+            def respond(self, url, roll: float, overloaded: bool, throttled: Optional[float]):
+                if overloaded:
+                    return self.send(503, b'{"status_code":11}', {"Content-Type": "application/json"})
+                if throttled is not None:
+                    body = b'{"status_code":25,"status_message":"Your request count is over the allowed limit."}'
+                    return self.send(429, body, {"Content-Type": "application/json",
+                                                 "Retry-After": str(max(1, math.ceil(throttled)))})
+                if roll < server.rate_429:
+                    body = b'{"status_code":25,"status_message":"Your request count is over the allowed limit."}'
+                    return self.send(429, body, {"Content-Type": "application/json",
+                                                 "Retry-After": str(server.retry_after)})
+                if roll < server.rate_429 + server.rate_5xx:
+                    return self.send(503, b'{"status_code":11}', {"Content-Type": "application/json"})
+                
+                body = server.body(url.path, parse_qs(url.query))
+                if body is None:
+                    body = b'{"status_code":34,"status_message":"The resource you requested could not be found."}'
+                    return self.send(404, body, {"Content-Type": "application/json"})
+                
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, b"", {"ETag": etag})
+                self.send(200, body, {"Content-Type": "application/json;charset=utf-8", "ETag": etag})
+        
+        return Handler
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if peak > 1 << 32 else peak / 1024
+
+
+def run_export(base_url: str, tv_id: int, workers: int, rate: float, use_async: bool,
+               options: Dict, result_queue: multiprocessing.Queue):
+    """在子进程中执行一次导出，保证峰值内存只统计导出本身
+    
+    导出抛出异常时同样放入一条带 error 的结果，父进程不会一直等待。
+    """
+    output = tempfile.mkdtemp(prefix="tmdb_bench_")
+    started = time.perf_counter()
+    try:
+        limiter = tmdb_export.RateLimiter(rate, 1.0)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if use_async:
+                import asyncio
+                
+                async def export():
+                    async with tmdb_export.AsyncTMDBExporter("bench", workers=workers, rate_limiter=limiter,
+                                                             base_url=base_url, **options) as exporter:
+                        return await exporter.export_series(tv_id, output)
+                success = asyncio.run(export())
+            else:
+                with tmdb_export.TMDBExporter("bench", workers=workers, rate_limiter=limiter,
+                                              base_url=base_url, **options) as exporter:
+                    success = exporter.export_series(tv_id, output)
+        files = sum(len(names) for _, _, names in os.walk(output))
+        result_queue.put({"success": success, "wall": time.perf_counter() - started,
+                          "files": files, "peak_rss_mb": peak_rss_mb()})
+    except Exception as e:
+        result_queue.put({"success": False, "wall": time.perf_counter() - started, "files": 0,
+                          "peak_rss_mb": peak_rss_mb(), "error": f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+
+
+def wait_result(process: multiprocessing.Process, result_queue: multiprocessing.Queue,
+                poll: float = 1.0) -> Optional[Dict]:
+    """等待子进程的结果；子进程未放入结果就退出（崩溃、被终止）时返回 None"""
+    while True:
+        try:
+            return result_queue.get(timeout=poll)
+        except queue.Empty:
+            if not process.is_alive():
+                # 退出前放入的结果可能刚刚到达
+                try:
+                    return result_queue.get(timeout=poll)
+                except queue.Empty:
+                    return None
+
+
+def run_scenario(server: FakeTMDBServer, name: str, workers: int, rate: float,
+                 use_async: bool = False, options: Optional[Dict] = None) -> Dict:
+    """运行一个基准场景并汇总服务端与导出进程的统计"""
+    tv_id, seasons, episodes = SCENARIOS[name]
+    server.warm(tv_id)
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    before = server.snapshot()
+    process = context.Process(target=run_export,
+                              args=(server.base_url, tv_id, workers, rate, use_async, options or {}, result_queue))
+    started = time.perf_counter()
+    process.start()
+    result = wait_result(process, result_queue)
+    if result is None:
+        result = {"success": False, "wall": time.perf_counter() - started, "files": 0, "peak_rss_mb": None,
+                  "error": f"导出进程异常退出 (exitcode {process.exitcode})"}
+    process.join()
+    after = server.snapshot()
+    
+    requests_issued = after["requests"] - before["requests"]
+    status = {code: count - before["status"].get(code, 0) for code, count in after["status"].items()
+              if count - before["status"].get(code, 0)}
+    return {
+        "scenario": name,
+        "episodes": seasons * episodes,
+        "backend": "async" if use_async else "sync",
+        "workers": workers,
+        "requests": requests_issued,
+        "status": status,
+        "bytes": after["bytes"] - before["bytes"],
+        "wall_s": round(result["wall"], 3),
+        "requests_per_s": round(requests_issued / result["wall"], 1) if result["wall"] else None,
+        "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] else None,
+        "files": result["files"],
+        "success": result["success"],
+        "error": result.get("error")
+    }
+
+
+def print_report(results: List[Dict]):
+    """输出基准测试结果表格"""
+    header = f"{'场景':<8}{'集数':>6}{'后端':>7}{'并发':>6}{'请求数':>8}{'耗时(s)':>10}{'请求/s':>9}{'峰值内存(MB)':>14}{'文件':>7}  状态码"
+    print(header)
+    print("-" * (len(header) + 16))
+    for r in results:
+        print(f"{r['scenario']:<8}{r['episodes']:>6}{r['backend']:>7}{r['workers']:>6}{r['requests']:>8}"
+              f"{r['wall_s']:>10.2f}{r['requests_per_s'] or 0:>9.1f}{r['peak_rss_mb'] or 0:>14.1f}{r['files']:>7}  "
+              f"{json.dumps(r['status'])}")
+    for r in results:
+        if not r["success"]:
+            print(f"场景 {r['scenario']} 失败: {r['error'] or '导出未成功完成'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TMDB 导出基准测试（使用本地模拟服务）")
+    parser.add_argument("--scenarios", type=str, default="small,medium,large",
+                        help="要运行的场景，逗号分隔 (small=20集, medium=120集, large=1000集)")
+    parser.add_argument("--workers", type=int, default=4, help="导出并发数 (默认4)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用 asyncio 后端")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="导出端限速（请求/秒），模拟 TMDB 真实限速可设为 4 (默认1000)")
+    parser.add_argument("--latency", type=float, default=0.02, help="每个请求的固定延迟，秒 (默认0.02)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限，秒")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率 (0~1)")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="返回 503 的概率 (0~1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 响应的 Retry-After 秒数")
+    parser.add_argument("--capacity", type=int, default=0,
+                        help="模拟服务同时处理的请求数上限，超出返回 503 (默认不限)")
+    parser.add_argument("--server-rate", type=float, default=0.0,
+                        help="模拟服务端限速（请求/秒），超出返回 429 (默认不限)")
+    parser.add_argument("--fixtures", type=str, default="", help="录制响应目录，存在的路径优先回放")
+    parser.add_argument("--seed", type=int, default=0, help="错误注入的随机种子")
+    parser.add_argument("--json", type=str, default="", help="将结果另存为 JSON 文件")
+    parser.add_argument("--serve", action="store_true", help="只启动模拟服务，不运行基准测试")
+    parser.add_argument("--port", type=int, default=0, help="模拟服务端口 (默认随机)")
+    args = parser.parse_args()
+    
+    shows = {tv_id: (seasons, episodes) for tv_id, seasons, episodes in SCENARIOS.values()}
+    if args.fixtures:
+        fixtures = RecordedFixtures(args.fixtures, shows)
+    else:
+        fixtures = SyntheticFixtures(shows)
+    server = FakeTMDBServer(fixtures, latency=args.latency, jitter=args.jitter,
+                            rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                            retry_after=args.retry_after, capacity=args.capacity,
+                            server_rate=args.server_rate, seed=args.seed, port=args.port).start()
+    
+    if args.serve:
+        print(f"模拟服务已启动: {server.base_url} （Ctrl+C 退出）")
+        for name, (tv_id, seasons, episodes) in SCENARIOS.items():
+            print(f"  剧集 {tv_id}: {seasons} 季 x {episodes} 集 ({name})")
+        print(f"  电影 {MOVIE_ID}，合集 {COLLECTION_ID}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+        return
+    
+    results = []
+    for name in filter(None, args.scenarios.split(",")):
+        if name not in SCENARIOS:
+            parser.error(f"未知场景: {name}")
+        results.append(run_scenario(server, name, args.workers, args.rate, args.use_async))
+    server.stop()
+    
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if not all(r["success"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
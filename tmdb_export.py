@@ -1,9 +1,31 @@
 import argparse
+import asyncio
+import contextlib
+import csv
+import hashlib
 import json
 import os
+import queue
+import re
+import socketserver
+import sqlite3
+import stat
+import sys
+import threading
 import time
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
-from typing import Dict, Any, Optional, List, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, List, Tuple, Callable, Mapping, Iterable
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # 异步后端为可选功能，仅在使用 --async 时需要
+    aiohttp = None
 
 # 模板结构定义
 TEMPLATES = {
@@ -64,272 +86,2339 @@ TEMPLATES = {
     }
 }
 
+# 模板字段与 TMDB 子资源的对应关系：{类型: {模板字段: (append_to_response 名称, 转换函数)}}
+# 转换函数把子资源的原始响应整理成模板期望的结构，子资源缺失时传入空字典
+SUB_RESOURCES = {
+    "movie": {
+        "casts": ("credits", lambda d: d),
+        "releases": ("release_dates", lambda d: {"countries": list(d.get("results", []))}),
+        "trailers": ("videos", lambda d: {"youtube": [v for v in d.get("results", []) if v.get("site") == "YouTube"]})
+    },
+    "series": {
+        "credits": ("credits", lambda d: {"cast": d.get("cast", [])}),
+        "external_ids": ("external_ids", lambda d: d),
+        "content_ratings": ("content_ratings", lambda d: d),
+        "videos": ("videos", lambda d: d)
+    },
+    "season": {
+        "credits": ("credits", lambda d: d),
+        "external_ids": ("external_ids", lambda d: d)
+    },
+    "episode": {
+        "credits": ("credits", lambda d: d),
+        "external_ids": ("external_ids", lambda d: d),
+        "videos": ("videos", lambda d: d)
+    },
+    "collection": {}
+}
+
+
+# 季数据的集条目中没有、--fast-episodes 模式下只能逐集请求的模板字段
+FAST_EPISODE_EXTRAS = ("external_ids", "videos")
+
+# 主语言中为空时用回退语言补全的文本字段
+TRANSLATABLE_FIELDS = ("name", "title", "overview", "tagline")
+
+
+def missing_text(kind: str, data: Dict) -> bool:
+    """该类型模板中的可翻译字段是否有为空的（原始数据或过滤后的数据均可）"""
+    return any(not data.get(field) for field in TRANSLATABLE_FIELDS if field in TEMPLATES[kind])
+
+
+def fill_missing_text(kind: str, data: Dict, fallback: Optional[Dict]) -> Dict:
+    """用回退语言的文本填充为空的可翻译字段（原地修改并返回 data）"""
+    if fallback:
+        for field in TRANSLATABLE_FIELDS:
+            if field in TEMPLATES[kind] and not data.get(field) and fallback.get(field):
+                data[field] = fallback[field]
+    return data
+
+
+def pick_translation(translations: Optional[Dict], language: str) -> Optional[Dict]:
+    """从 /translations 响应中取出指定语言的文本，没有该地区时使用同语种的其他地区"""
+    lang, _, region = language.partition("-")
+    candidates = [t for t in (translations or {}).get("translations", []) if t.get("iso_639_1") == lang]
+    if not candidates:
+        return None
+    exact = [t for t in candidates if t.get("iso_3166_1") == region]
+    data = dict((exact or candidates)[0].get("data") or {})
+    # 合集的译文用 title 表示名称
+    data.setdefault("name", data.get("title"))
+    return data
+
+
+def plan_sub_resources(kind: str) -> Dict[str, Tuple[str, Callable]]:
+    """根据模板字段确定该类型需要附带获取的子资源"""
+    return {key: sub for key, sub in SUB_RESOURCES[kind].items() if key in TEMPLATES[kind]}
+
+
+def append_params(kind: str) -> Optional[Dict[str, str]]:
+    """该类型对象请求所需的 append_to_response 参数，无子资源时返回 None"""
+    appends = sorted({name for name, _ in plan_sub_resources(kind).values()})
+    return {"append_to_response": ",".join(appends)} if appends else None
+
+
+def split_sub_resources(kind: str, data: Dict) -> Dict:
+    """把 append_to_response 的合并响应拆分为模板字段的结构（原地修改并返回 data）"""
+    plan = plan_sub_resources(kind)
+    subs = {name: data.pop(name, None) or {} for name, _ in plan.values()}
+    for key, (name, convert) in plan.items():
+        data[key] = convert(subs[name])
+    return data
+
+
+def compile_template(template: Dict, item_fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+                     name: str = "project") -> Callable[[Dict], Dict]:
+    """把模板编译为投影函数，结果与 TMDBExporter.filter_data 相同
+    
+    为模板（及每个嵌套模板）生成一个按模板顺序直接取值的函数，
+    运行时不再遍历模板、也不再按默认值类型分支。
+    
+    Args:
+        template: TEMPLATES 中的模板
+        item_fields: 列表元素字段裁剪 {键路径: 保留的字段}，
+            如 {"credits.cast": ("id", "name", "character", "profile_path")}
+    """
+    namespace = {}
+    source = []
+    
+    def build(tmpl: Dict, prefix: str, func: str) -> str:
+        lines = [f"def {func}(data):", "    get = data.get"]
+        fields = []
+        for index, (key, default) in enumerate(tmpl.items()):
+            path = prefix + key
+            value = f"v{index}"
+            fallback = f"{func}_d{index}"
+            namespace[fallback] = default
+            lines.append(f"    {value} = get({key!r})")
+            # 缺失或为 null 时使用模板默认值
+            plain = f"{fallback} if {value} is None else {value}"
+            if isinstance(default, dict):
+                nested = build(default, path + ".", f"{func}_{index}")
+                expr = f"{nested}({value}) if isinstance({value}, dict) else ({plain})"
+            elif item_fields and path in item_fields:
+                keep = f"{func}_k{index}"
+                namespace[keep] = tuple(item_fields[path])
+                expr = (f"[{{k: item[k] for k in {keep} if k in item}} for item in {value}] "
+                        f"if isinstance({value}, list) else ({plain})")
+            else:
+                expr = plain
+            fields.append(f"{key!r}: ({expr})")
+        lines.append("    return {" + ", ".join(fields) + "}")
+        source.append("\n".join(lines))
+        return func
+    
+    build(template, "", name)
+    exec("\n\n".join(source), namespace)
+    return namespace[name]
+
+
+def template_list_paths() -> set:
+    """所有模板中默认值为列表的键路径（可用于列表元素字段裁剪）"""
+    paths = set()
+    
+    def walk(tmpl: Dict, prefix: str):
+        for key, default in tmpl.items():
+            if isinstance(default, dict):
+                walk(default, f"{prefix}{key}.")
+            elif isinstance(default, list):
+                paths.add(prefix + key)
+    
+    for template in TEMPLATES.values():
+        walk(template, "")
+    return paths
+
+
+def compile_projections(item_fields: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, Callable[[Dict], Dict]]:
+    """编译所有模板 {类型: 投影函数}"""
+    return {kind: compile_template(template, item_fields, f"project_{kind}")
+            for kind, template in TEMPLATES.items()}
+
+
+# 不裁剪列表元素的默认投影，导入时编译一次
+PROJECTIONS = compile_projections()
+
+
+class RateLimiter:
+    """令牌桶限速器，同一进程内的所有导出线程共享一个实例
+    
+    Args:
+        rate: 每个时间窗口允许的请求数
+        per: 时间窗口长度（秒）
+    """
+    def __init__(self, rate: int = 40, per: float = 10.0):
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+    
+    def _try_acquire(self, amount: float = 1) -> float:
+        """尝试取出 amount 个令牌，成功返回 0，否则返回需要等待的秒数
+        
+        amount 超过桶容量时桶满即可取出，余额记为负数，后续请求相应多等
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= min(amount, self.capacity):
+                self.tokens -= amount
+                return 0.0
+            return (min(amount, self.capacity) - self.tokens) / self.fill_rate
+    
+    def acquire(self, amount: float = 1):
+        """获取 amount 个令牌（默认一个请求），令牌不足或处于暂停期时阻塞等待"""
+        while True:
+            wait = self._try_acquire(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """按服务端 Retry-After 暂停所有线程，恢复后令牌从零开始累积"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = max(self.updated, self.paused_until)
+
+
+class ConcurrencyController:
+    """根据 429/5xx 反馈自适应调整并发请求数（AIMD），并带熔断器
+    
+    请求成功且延迟未明显升高时，每轮并发上限加 1；收到 5xx、网络错误或不带 Retry-After 的 429 时上限减半。
+    带 Retry-After 的 429 只表示超出速率，由限速器按服务端要求统一暂停，不计入错误。
+    最近请求的错误率超过阈值时熔断：所有请求暂停 cooldown 秒，之后只放行一个探测请求，
+    探测成功才恢复，失败则冷却时间加倍。
+    
+    Args:
+        max_limit: 并发上限的最大值，通常为 --workers
+        min_limit: 并发上限的最小值，默认为 max_limit 的四分之一，避免偶发错误把并发压到 1
+        window: 计算错误率的最近请求数
+        error_threshold: 触发熔断的错误率
+        cooldown: 首次熔断的暂停秒数
+        max_cooldown: 熔断暂停的最大秒数
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    # 延迟超过基线的倍数时不再增加并发
+    LATENCY_TOLERANCE = 2.0
+    POLL_INTERVAL = 0.01
+    
+    def __init__(self, max_limit: int, min_limit: Optional[int] = None, window: int = 20,
+                 error_threshold: float = 0.5, cooldown: float = 1.0, max_cooldown: float = 16.0):
+        self.max_limit = max(1, max_limit)
+        if min_limit is None:
+            min_limit = self.max_limit // 4
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.outcomes = deque(maxlen=window)
+        self.error_threshold = error_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.open_until = 0.0
+        self.probing = False
+        self.latency_baseline: Optional[float] = None
+        self.last_decrease = 0.0
+        self.trips = 0
+        self.condition = threading.Condition()
+    
+    @property
+    def tripped(self) -> bool:
+        """熔断器是否处于断开或探测状态"""
+        return self.state != self.CLOSED
+    
+    def _reserve(self) -> float:
+        """尝试占用一个并发名额（调用方持有锁），成功返回 0，否则返回建议等待的秒数"""
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now < self.open_until:
+                return self.open_until - now
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # 等熔断前发出的请求全部结束后再放行唯一的探测请求
+            if self.probing or self.in_flight:
+                return self.POLL_INTERVAL
+            self.probing = True
+            self.in_flight += 1
+            return 0.0
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return 0.0
+        return self.POLL_INTERVAL
+    
+    def acquire(self):
+        """占用一个并发名额，名额已满或熔断期间阻塞等待"""
+        with self.condition:
+            while True:
+                wait = self._reserve()
+                if wait <= 0:
+                    return
+                self.condition.wait(wait)
+    
+    async def acquire_async(self):
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        while True:
+            with self.condition:
+                wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+    
+    def _trip(self, now: float, retry_after: Optional[float]):
+        self.state = self.OPEN
+        self.open_until = now + max(self.cooldown, retry_after or 0.0)
+        self.outcomes.clear()
+        self.trips += 1
+        print(f"请求错误率过高，暂停所有请求 {self.open_until - now:.0f} 秒")
+    
+    def release(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """释放名额并反馈请求结果
+        
+        Args:
+            status: HTTP 状态码，网络错误时为 None
+            latency: 请求耗时（秒）
+            retry_after: 服务端 Retry-After 指定的等待秒数
+        """
+        throttled = status == 429 and retry_after is not None
+        error = not throttled and (status is None or status == 429 or status >= 500)
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and self.probing:
+                self.probing = False
+                if error or throttled:
+                    self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                    self._trip(now, retry_after)
+                else:
+                    print("请求已恢复")
+                    self.state = self.CLOSED
+                    self.cooldown = self.base_cooldown
+            elif throttled:
+                pass
+            elif error:
+                self.outcomes.append(True)
+                # 只有上次减半之后发出的请求失败才再次减半，同一批并发请求的失败只算一次
+                if now - latency >= self.last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self.last_decrease = now
+                if (self.state == self.CLOSED and len(self.outcomes) == self.outcomes.maxlen
+                        and sum(self.outcomes) >= self.error_threshold * len(self.outcomes)):
+                    self._trip(now, None)
+            else:
+                self.outcomes.append(False)
+                if self.latency_baseline is None or latency < self.latency_baseline:
+                    self.latency_baseline = latency
+                else:
+                    # 基线缓慢跟随延迟上升，服务端整体变慢后仍能继续增加并发
+                    self.latency_baseline += (latency - self.latency_baseline) * 0.01
+                if latency <= self.latency_baseline * self.LATENCY_TOLERANCE:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p"
+
+# 可下载的图片类型：{类型: 数据中的图片路径字段}，以及各类型的默认尺寸
+ARTWORK_FIELDS = {"poster": "poster_path", "backdrop": "backdrop_path", "still": "still_path"}
+ARTWORK_SIZES = {"poster": "original", "backdrop": "original", "still": "original"}
+
+# TMDB 文档限速：约 40 请求 / 10 秒
+RATE_LIMITER = RateLimiter(40, 10.0)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无效时返回 None"""
+    if headers is None:
+        return None
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_permanent_error(status: Optional[int]) -> bool:
+    """客户端错误（404 等）重试也不会成功；408 超时与 429 限流除外"""
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+# 端点类别，按顺序匹配
+ENDPOINT_PATTERNS = [
+    ("changes", re.compile(r"^/(tv|movie)/\d+/changes")),
+    ("episode", re.compile(r"^/tv/\d+/season/\d+/episode/\d+")),
+    ("season", re.compile(r"^/tv/\d+/season/\d+")),
+    ("series", re.compile(r"^/tv/\d+")),
+    ("movie", re.compile(r"^/movie/\d+")),
+    ("collection", re.compile(r"^/collection/\d+"))
+]
+
+# 各类端点的缓存有效期（秒），过期后用 ETag 重新验证
+CACHE_TTLS = {
+    "movie": 7 * 86400,
+    "series": 86400,
+    "season": 3 * 86400,
+    "episode": 7 * 86400,
+    "collection": 30 * 86400,
+    "changes": 0,
+    "other": 86400
+}
+
+# 增量导出清单文件名（位于各输出目录内）
+MANIFEST_FILE = ".export-manifest.json"
+
+# --format bundle 时输出目录下的打包文件名
+BUNDLE_FILE = "export.bundle"
+
+# --people-table 时剧集输出目录下的人物表文件名，以及移入人物表的个人信息字段
+PEOPLE_FILE = "people.json"
+PERSON_FIELDS = ("name", "original_name", "gender", "profile_path", "known_for_department", "adult", "popularity")
+
+# TMDB changes 接口最多查询 14 天内的变更
+CHANGES_WINDOW = 14 * 86400
+
+
+def endpoint_kind(endpoint: str) -> str:
+    """返回端点所属类别：movie / series / season / episode / collection / other"""
+    for kind, pattern in ENDPOINT_PATTERNS:
+        if pattern.match(endpoint):
+            return kind
+    return "other"
+
+
+CacheEntry = namedtuple("CacheEntry", ["data", "etag", "fresh"])
+
+
+class ExportMetrics:
+    """导出过程的统计数据（线程安全）
+    
+    按端点类别（movie / series / season / episode / collection / changes / sub_resource / other）
+    记录请求数、状态码、延迟直方图、重试与退避时间、响应大小和缓存命中，
+    并按阶段（限速等待、投影、序列化、写文件）累计耗时。
+    """
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.endpoints: Dict[str, Dict] = {}
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.gauges: Dict[str, float] = {}
+    
+    @staticmethod
+    def classify(endpoint: str) -> str:
+        """端点类别；对象后面还有路径的（如 /tv/1/credits）归为 sub_resource"""
+        kind = endpoint_kind(endpoint)
+        if kind in ("changes", "other"):
+            return kind
+        for pattern_kind, pattern in ENDPOINT_PATTERNS:
+            if pattern_kind == kind:
+                return kind if pattern.fullmatch(endpoint) else "sub_resource"
+        return kind
+    
+    def _endpoint(self, endpoint: str) -> Dict:
+        kind = self.classify(endpoint)
+        if kind not in self.endpoints:
+            self.endpoints[kind] = {
+                "requests": 0, "status": defaultdict(int), "retries": 0, "backoff_seconds": 0.0,
+                "response_bytes": 0, "latency_sum": 0.0, "latency_max": 0.0,
+                "latency_buckets": [0] * (len(self.LATENCY_BUCKETS) + 1), "cache": defaultdict(int)
+            }
+        return self.endpoints[kind]
+    
+    def record_request(self, endpoint: str, seconds: float, status: str, size: int = 0):
+        """记录一次 HTTP 请求（每次重试各记一次）"""
+        with self.lock:
+            stats = self._endpoint(endpoint)
+            stats["requests"] += 1
+            stats["status"][status] += 1
+            stats["response_bytes"] += size
+            stats["latency_sum"] += seconds
+            stats["latency_max"] = max(stats["latency_max"], seconds)
+            index = len(self.LATENCY_BUCKETS)
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    index = i
+                    break
+            stats["latency_buckets"][index] += 1
+    
+    def record_retry(self, endpoint: str, backoff: float):
+        """记录一次重试及其退避等待时间"""
+        with self.lock:
+            stats = self._endpoint(endpoint)
+            stats["retries"] += 1
+            stats["backoff_seconds"] += backoff
+    
+    def record_cache(self, endpoint: str, result: str):
+        """记录缓存结果：hit（直接使用）/ revalidated（304）/ stale（请求失败回退）"""
+        with self.lock:
+            self._endpoint(endpoint)["cache"][result] += 1
+    
+    def set_gauge(self, name: str, value: float):
+        with self.lock:
+            self.gauges[name] = value
+    
+    def add_stage(self, stage: str, seconds: float):
+        with self.lock:
+            self.stages[stage] += seconds
+    
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """累计代码块耗时到指定阶段"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started)
+    
+    def summary(self) -> Dict:
+        """JSON 格式的统计摘要"""
+        with self.lock:
+            endpoints = {}
+            for kind, stats in sorted(self.endpoints.items()):
+                requests_count = stats["requests"]
+                endpoints[kind] = {
+                    "requests": requests_count,
+                    "status": dict(stats["status"]),
+                    "retries": stats["retries"],
+                    "backoff_seconds": round(stats["backoff_seconds"], 3),
+                    "response_bytes": stats["response_bytes"],
+                    "latency_avg_seconds": round(stats["latency_sum"] / requests_count, 4) if requests_count else None,
+                    "latency_max_seconds": round(stats["latency_max"], 4),
+                    "latency_histogram": {
+                        **{str(bound): count for bound, count in zip(self.LATENCY_BUCKETS, stats["latency_buckets"])},
+                        "+Inf": stats["latency_buckets"][-1]
+                    },
+                    "cache": dict(stats["cache"])
+                }
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "requests": sum(e["requests"] for e in endpoints.values()),
+                "endpoints": endpoints,
+                "stages_seconds": {k: round(v, 4) for k, v in sorted(self.stages.items())},
+                "gauges": dict(sorted(self.gauges.items()))
+            }
+    
+    def to_prometheus(self) -> str:
+        """Prometheus textfile 格式"""
+        summary = self.summary()
+        with self.lock:
+            endpoints = {kind: dict(stats) for kind, stats in self.endpoints.items()}
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP tmdb_export_{name} {help_text}")
+            lines.append(f"# TYPE tmdb_export_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"tmdb_export_{name}{labels} {value}")
+        
+        metric("requests_total", "counter", "HTTP requests issued, including retries",
+               [(f'{{endpoint="{k}",status="{status}"}}', count)
+                for k, e in sorted(endpoints.items()) for status, count in sorted(e["status"].items())])
+        metric("retries_total", "counter", "Request retries",
+               [(f'{{endpoint="{k}"}}', e["retries"]) for k, e in sorted(endpoints.items())])
+        metric("backoff_seconds_total", "counter", "Time spent in retry backoff",
+               [(f'{{endpoint="{k}"}}', round(e["backoff_seconds"], 3)) for k, e in sorted(endpoints.items())])
+        metric("response_bytes_total", "counter", "Response body bytes received",
+               [(f'{{endpoint="{k}"}}', e["response_bytes"]) for k, e in sorted(endpoints.items())])
+        metric("cache_total", "counter", "Response cache results",
+               [(f'{{endpoint="{k}",result="{result}"}}', count)
+                for k, e in sorted(endpoints.items()) for result, count in sorted(e["cache"].items())])
+        
+        samples = []
+        for k, e in sorted(endpoints.items()):
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, e["latency_buckets"]):
+                cumulative += count
+                samples.append((f'_bucket{{endpoint="{k}",le="{bound}"}}', cumulative))
+            samples.append((f'_bucket{{endpoint="{k}",le="+Inf"}}', e["requests"]))
+            samples.append((f'_sum{{endpoint="{k}"}}', round(e["latency_sum"], 4)))
+            samples.append((f'_count{{endpoint="{k}"}}', e["requests"]))
+        metric("request_duration_seconds", "histogram", "HTTP request latency", samples)
+        
+        metric("stage_seconds_total", "counter", "Time spent per export stage",
+               [(f'{{stage="{k}"}}', v) for k, v in summary["stages_seconds"].items()])
+        for name, value in summary["gauges"].items():
+            metric(name, "gauge", name.replace("_", " ").capitalize(), [("", round(value, 3))])
+        metric("run_duration_seconds", "gauge", "Duration of the export run",
+               [("", summary["duration_seconds"])])
+        metric("last_run_timestamp_seconds", "gauge", "Start time of the export run",
+               [("", round(self.started_at, 3))])
+        return "\n".join(lines) + "\n"
+    
+    def write(self, path: str):
+        """写出统计：.prom 结尾为 Prometheus textfile，否则为 JSON；先写临时文件再替换"""
+        if path.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.summary(), indent=2, ensure_ascii=False) + "\n"
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """基于 SQLite 的 TMDB 响应缓存
+    
+    以 端点 + 参数 + 语言 为键保存原始响应，按端点类别设置有效期，
+    总大小超过 max_bytes 时按最近访问时间淘汰（LRU）。
+    
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存响应体的总字节上限
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "responses.sqlite3"),
+                                    check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            etag TEXT,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+    
+    @staticmethod
+    def make_key(endpoint: str, params: Dict, language: Optional[str]) -> str:
+        """生成缓存键（不含 api_key）"""
+        query = urlencode(sorted((k, str(v)) for k, v in params.items() if k != "api_key"))
+        return f"{language or ''}|{endpoint}?{query}"
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存并更新访问时间，未命中返回 None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT body, etag, expires_at FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        body, etag, expires_at = row
+        return CacheEntry(json.loads(body), etag, expires_at > now)
+    
+    def put(self, key: str, endpoint: str, body: bytes, etag: Optional[str]):
+        """写入响应，必要时淘汰最久未访问的条目"""
+        now = time.time()
+        expires_at = now + CACHE_TTLS[endpoint_kind(endpoint)]
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, body, etag, expires_at, now, len(body)))
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+    
+    def touch(self, key: str, endpoint: str):
+        """服务端返回 304 时延长有效期"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                              (now + CACHE_TTLS[endpoint_kind(endpoint)], now, key))
+    
+    def _evict(self):
+        """淘汰到上限的 90%，留出余量避免每次写入都触发淘汰"""
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class HotCache:
+    """进程内的 LRU 响应缓存，供服务模式在多次导出之间复用响应
+    
+    保存本进程获取到的原始响应体，每次读取重新解析，调用方可以放心修改返回的数据。
+    指定 backing 时放在磁盘缓存前面：写入同时写到磁盘，内存未命中时再查磁盘。
+    
+    Args:
+        backing: 磁盘缓存（ResponseCache），为 None 时只使用内存
+        max_entries: 内存中最多保存的响应数
+    """
+    make_key = staticmethod(ResponseCache.make_key)
+    
+    def __init__(self, backing: Optional[ResponseCache] = None, max_entries: int = 4096):
+        self.backing = backing
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # 键 -> (响应体, etag, 过期时间)
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """读取缓存，内存未命中时查询磁盘缓存"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is None:
+            return self.backing.get(key) if self.backing else None
+        body, etag, expires_at = entry
+        return CacheEntry(json.loads(body), etag, expires_at > time.time())
+    
+    def put(self, key: str, endpoint: str, body: bytes, etag: Optional[str]):
+        """写入响应，超过条目上限时淘汰最久未访问的条目"""
+        with self.lock:
+            self.entries[key] = (body, etag, time.time() + CACHE_TTLS[endpoint_kind(endpoint)])
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.backing:
+            self.backing.put(key, endpoint, body, etag)
+    
+    def touch(self, key: str, endpoint: str):
+        """服务端返回 304 时延长有效期"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries[key] = (entry[0], entry[1], time.time() + CACHE_TTLS[endpoint_kind(endpoint)])
+        if self.backing:
+            self.backing.touch(key, endpoint)
+    
+    def close(self):
+        with self.lock:
+            self.entries.clear()
+        if self.backing:
+            self.backing.close()
+
+
+class ExportBundle:
+    """打包输出：所有 JSON 文档写入同一个 SQLite 文件，代替大量零散的小文件
+    
+    文档以相对于 root 的路径为键保存（与目录输出的布局一致），并按
+    (tmdbid, 季号, 集号) 建立索引，读取单集时不需要加载其他内容；
+    expand 可还原为目录输出的文件结构。
+    
+    Args:
+        path: 打包文件路径
+        root: 输出根目录，文档键为相对于它的路径
+    """
+    # {tmdbid}/{movie|series|collection}/ 以及 season-X.json / season-X-episode-Y.json
+    OBJECT_PATTERN = re.compile(r"(?:^|/)(\d+)/(movie|series|collection)/")
+    SEASON_PATTERN = re.compile(r"(?:^|/)season-(\d+)(?:-episode-(\d+))?\.json$")
+    
+    def __init__(self, path: str, root: str = ""):
+        self.path = path
+        self.root = root
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS documents (
+            path TEXT PRIMARY KEY,
+            tmdb_id INTEGER,
+            kind TEXT,
+            season INTEGER,
+            episode INTEGER,
+            body TEXT NOT NULL
+        )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS documents_episode ON documents (tmdb_id, season, episode)")
+    
+    def key(self, path: str) -> str:
+        """文件路径对应的文档键"""
+        return os.path.relpath(path, self.root or ".").replace(os.sep, "/")
+    
+    def put(self, path: str, text: str):
+        """写入（或覆盖）一个文档"""
+        key = self.key(path)
+        tmdb_id = kind = season = episode = None
+        match = self.OBJECT_PATTERN.search(key)
+        if match:
+            tmdb_id, kind = int(match.group(1)), match.group(2)
+        match = self.SEASON_PATTERN.search(key)
+        if match:
+            season = int(match.group(1))
+            episode = int(match.group(2)) if match.group(2) else None
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, tmdb_id, kind, season, episode, text))
+    
+    def get(self, path: str) -> Optional[str]:
+        """按文件路径读取文档原文，不存在时返回 None"""
+        with self.lock:
+            row = self.conn.execute("SELECT body FROM documents WHERE path = ?", (self.key(path),)).fetchone()
+        return row[0] if row else None
+    
+    def exists(self, path: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM documents WHERE path = ?",
+                                     (self.key(path),)).fetchone() is not None
+    
+    def get_episode(self, tmdb_id: int, season: int, episode: Optional[int] = None) -> Optional[Dict]:
+        """读取一集（episode 为 None 时读取整季）的文档，季号为导出后的季号"""
+        query = "SELECT body FROM documents WHERE tmdb_id = ? AND season = ? AND "
+        query += "episode IS NULL" if episode is None else "episode = ?"
+        params = (tmdb_id, season) if episode is None else (tmdb_id, season, episode)
+        with self.lock:
+            row = self.conn.execute(query + " LIMIT 1", params).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def paths(self, prefix: str = "") -> List[str]:
+        """包内所有文档键，可按前缀过滤（例如 '1399/'）"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path FROM documents WHERE substr(path, 1, ?) = ? ORDER BY path",
+                                     (len(prefix), prefix)).fetchall()
+        return [row[0] for row in rows]
+    
+    def expand(self, target_dir: str, prefix: str = "") -> int:
+        """还原为目录输出的文件结构
+        
+        返回: 写出的文件数
+        """
+        count = 0
+        for key in self.paths(prefix):
+            path = os.path.join(target_dir, *key.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.get(os.path.join(self.root, key)))
+            count += 1
+        return count
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class OutputWriter:
+    """后台写文件线程：导出线程只把内容放入有界队列，写盘不阻塞请求
+    
+    每个文件先写入同目录下的隐藏临时文件再原子替换，进程中途被终止也不会留下写了一半的 JSON。
+    
+    Args:
+        max_pending: 队列中最多等待写入的文件数，队列满时提交方阻塞
+        fsync: 是否确保落盘；开启后每个临时文件在替换前 fsync，替换后每个目录再 fsync 一次
+        batch_size: 每批最多写入的文件数
+        metrics: 统计数据收集器，写盘耗时计入 disk_write 阶段
+    """
+    def __init__(self, max_pending: int = 256, fsync: bool = False, batch_size: int = 64,
+                 metrics: Optional[ExportMetrics] = None):
+        self.queue = queue.Queue(max_pending)
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.error: Optional[Exception] = None
+        self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self.thread.start()
+    
+    def submit(self, path: str, text: str):
+        """提交一个文件，队列满时等待"""
+        self._raise_error()
+        self.queue.put((path, text))
+    
+    def flush(self):
+        """等待已提交的文件全部写完"""
+        self.queue.join()
+        self._raise_error()
+    
+    def close(self):
+        """写完已提交的文件并停止写线程，可重复调用"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise_error()
+    
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+    
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                started = time.perf_counter()
+                # 同一批内同一路径只保留最后一次写入的内容
+                self._write_batch(dict(item for item in batch if item is not None))
+                if self.metrics:
+                    self.metrics.add_stage("disk_write", time.perf_counter() - started)
+            except Exception as e:
+                # 记录错误并继续处理队列，由下一次 submit/flush 抛出
+                print(f"写入文件失败: {e}")
+                self.error = self.error or e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if None in batch:
+                return
+    
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.tmp")
+    
+    def _write_batch(self, files: Dict[str, str]):
+        for path, text in files.items():
+            with open(self._temp_path(path), "w", encoding="utf-8") as f:
+                f.write(text)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        for path in files:
+            os.replace(self._temp_path(path), path)
+        if self.fsync:
+            # 同一批的文件大多在同一目录下，每个目录只同步一次，确保替换后的目录项也已落盘
+            for directory in {os.path.dirname(os.path.abspath(path)) for path in files}:
+                self._sync_dir(directory)
+    
+    @staticmethod
+    def _sync_dir(directory: str):
+        """同步目录项；Windows 无法打开目录，替换本身已由系统保证"""
+        if os.name == "nt":
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class ArtworkDownloader:
+    """并发下载海报、背景图和剧照
+    
+    使用独立的有界线程池和连接池，与元数据请求互不占用；响应按块流式写入同目录下的临时文件后原子替换，
+    内存中不保留整张图片。本地已有且大小与服务端一致的文件不再下载。
+    
+    Args:
+        sizes: 各图片类型使用的尺寸 {类型: TMDB 尺寸名}，默认 ARTWORK_SIZES
+        workers: 同时下载的图片数（连接池大小相同）
+        bandwidth: 所有下载合计的带宽上限（字节/秒），0 为不限
+        metrics: 统计数据收集器，下载耗时计入 artwork_download 阶段
+        base_url: 图片地址前缀
+    """
+    CHUNK_SIZE = 64 * 1024
+    MAX_ATTEMPTS = 3
+    
+    def __init__(self, sizes: Optional[Dict[str, str]] = None, workers: int = 8, bandwidth: float = 0,
+                 metrics: Optional[ExportMetrics] = None, base_url: str = TMDB_IMAGE_URL):
+        self.sizes = sizes or dict(ARTWORK_SIZES)
+        self.base_url = base_url
+        self.metrics = metrics
+        self.limiter = RateLimiter(bandwidth, 1.0) if bandwidth else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artwork")
+        self.lock = threading.Lock()
+        self.pending: Dict[str, Any] = {}  # 目标路径 -> 下载任务，同一文件同时只下载一次
+        self.counts: Dict[str, int] = defaultdict(int)
+    
+    def submit(self, kind: str, image_path: Optional[str], target_prefix: str):
+        """提交一张图片，保存为 {target_prefix}{类型}{扩展名}，image_path 为空时忽略"""
+        if not image_path:
+            return
+        target = f"{target_prefix}{kind}{os.path.splitext(image_path)[1] or '.jpg'}"
+        with self.lock:
+            if target in self.pending:
+                return
+            self.pending[target] = self.pool.submit(self._download, kind, image_path, target)
+    
+    def wait(self):
+        """等待已提交的图片全部下载完"""
+        with self.lock:
+            futures = list(self.pending.values())
+        wait_futures(futures)
+        with self.lock:
+            for target in [t for t, future in self.pending.items() if future.done()]:
+                del self.pending[target]
+    
+    def close(self):
+        self.wait()
+        self.pool.shutdown()
+        self.session.close()
+    
+    def _count(self, result: str, size: int = 0):
+        with self.lock:
+            self.counts[result] += 1
+            self.counts["bytes"] += size
+            counts = dict(self.counts)
+        if self.metrics:
+            for name, value in counts.items():
+                self.metrics.set_gauge(f"artwork_{name}", value)
+    
+    def _download(self, kind: str, image_path: str, target: str):
+        url = f"{self.base_url}/{self.sizes[kind]}{image_path}"
+        error = None
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(2 ** (attempt - 1))
+                try:
+                    if os.path.isfile(target):
+                        head = self.session.head(url, allow_redirects=True, timeout=30)
+                        if head.ok and head.headers.get("Content-Length") == str(os.path.getsize(target)):
+                            return self._count("skipped")
+                    with self.session.get(url, stream=True, timeout=30) as response:
+                        if is_permanent_error(response.status_code):
+                            print(f"警告: 图片不存在 {image_path} (HTTP {response.status_code})")
+                            return self._count("failed")
+                        response.raise_for_status()
+                        return self._count("downloaded", self._stream(response, target))
+                except (requests.RequestException, OSError) as e:
+                    error = e
+            print(f"警告: 图片下载失败 {image_path}: {error}")
+            self._count("failed")
+        finally:
+            if self.metrics:
+                self.metrics.add_stage("artwork_download", time.perf_counter() - started)
+    
+    def _stream(self, response: requests.Response, target: str) -> int:
+        """按块写入临时文件，完整后替换目标文件，返回字节数"""
+        directory, name = os.path.split(target)
+        os.makedirs(directory or ".", exist_ok=True)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        expected = response.headers.get("Content-Length")
+        written = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    if self.limiter:
+                        self.limiter.acquire(len(chunk))
+                    f.write(chunk)
+                    written += len(chunk)
+            if expected is not None and written != int(expected):
+                raise requests.RequestException(f"响应不完整: {written}/{expected} 字节")
+            os.replace(tmp_path, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return written
+
+
+def intern_strings(value: Any) -> Any:
+    """递归驻留字典键和字符串值，重复出现的职位、部门、角色名等在内存中只保留一份"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k): intern_strings(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [intern_strings(v) for v in value]
+    return value
+
+
+class PeopleTable:
+    """剧集的共享人物表：演职员的个人信息每人只保存一次，文档中的列表只保留 id 和角色信息
+    
+    人物信息字段见 PERSON_FIELDS，其余字段（character、job、department、order、credit_id 等）
+    作为角色信息留在文档中。
+    
+    人物表只包含本次导出的文档引用的人物，人物信息以本次获取的为准；
+    增量导出跳过的文档引用的人物由 seed 从上次的 people.json 补入。
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.people: Dict[str, Dict] = {}
+        self.saved: set = set()  # 本次写出（含内容未变化）的文档文件名
+    
+    def normalize(self, doc: Dict) -> Dict:
+        """把文档 credits 中的演职员替换为引用（原地修改并返回 doc）"""
+        credits = doc.get("credits")
+        if not isinstance(credits, dict):
+            return doc
+        for key, items in credits.items():
+            if isinstance(items, list):
+                credits[key] = [self._reference(item) for item in items]
+        return doc
+    
+    def _reference(self, item: Any) -> Any:
+        if not isinstance(item, dict) or item.get("id") is None:
+            return item
+        key = str(item["id"])
+        with self.lock:
+            if key not in self.people:
+                self.people[key] = intern_strings({field: item[field] for field in ("id",) + PERSON_FIELDS
+                                                   if field in item})
+        return intern_strings({field: value for field, value in item.items() if field not in PERSON_FIELDS})
+    
+    def seed(self, previous: Dict[str, Dict], ids: Iterable[str]):
+        """从上次的人物表中补入指定人物，本次已获取的人物不被覆盖"""
+        with self.lock:
+            for key in ids:
+                if key not in self.people and key in previous:
+                    self.people[key] = intern_strings(previous[key])
+    
+    def to_dict(self) -> Dict[str, Dict]:
+        """按人物 ID 排序的人物表"""
+        with self.lock:
+            return {key: self.people[key] for key in sorted(self.people, key=int)}
+
+
 class TMDBExporter:
-    def __init__(self, api_key: str, api_version: str = "v3"):
-        self.base_url = f"https://api.themoviedb.org/3"
+    def __init__(self, api_key: str, api_version: str = "v3", workers: int = 1,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 offline: bool = False, refresh: bool = False, incremental: bool = False,
+                 item_fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 metrics: Optional[ExportMetrics] = None,
+                 controller: Optional[ConcurrencyController] = None,
+                 bundle: Optional[ExportBundle] = None,
+                 compact: bool = False, fsync: bool = False,
+                 fast_episodes: Optional[Tuple[str, ...]] = None,
+                 fallback_language: str = "en-US",
+                 artwork: Optional[ArtworkDownloader] = None,
+                 people_table: bool = False,
+                 base_url: str = TMDB_BASE_URL):
+        """
+        Args:
+            workers: 并发请求线程数
+            rate_limiter: 限速器，默认使用进程共享的 RATE_LIMITER
+            cache: 响应缓存，为 None 时不缓存
+            offline: 只使用缓存，不发出网络请求
+            refresh: 忽略缓存有效期，所有缓存条目都向服务端重新验证
+            incremental: 增量导出，内容未变化的文件不重写，未变化的季不重新获取
+            item_fields: 列表元素字段裁剪，见 compile_template
+            metrics: 统计数据收集器，默认新建
+            controller: 自适应并发控制器，默认以 workers 为上限新建
+            bundle: 打包输出，指定后所有文件写入该包而不是输出目录
+            compact: 输出不缩进的紧凑 JSON
+            fsync: 目录输出时确保文件落盘（逐个 fsync 文件，每批每个目录同步一次）
+            fast_episodes: 用季数据构造集数据，不再逐集请求；元组中为仍需逐集补充请求的字段
+                （取自 FAST_EPISODE_EXTRAS，模板不需要的字段忽略），空元组表示不补充，None 表示关闭
+            fallback_language: 名称、简介等在中文中为空时使用的回退语言，空字符串表示不回退
+            artwork: 图片下载器，指定后同时下载海报、背景图、季海报和剧照（仅目录输出）
+            people_table: 剧集的演职员信息写入共享的 people.json，剧集、季、集文档中只保留 id 和角色
+            base_url: API 地址，测试和基准测试时可指向本地模拟服务
+        """
+        self.base_url = base_url
         self.api_key = api_key
-        self.session = requests.Session()
-        self.session.params = {"api_key": self.api_key, "language": "zh-CN"}
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or RATE_LIMITER
+        self.cache = cache
+        self.offline = offline
+        self.refresh = refresh
+        self.incremental = incremental
+        self.item_fields = item_fields or {}
+        self.projections = compile_projections(item_fields) if item_fields else PROJECTIONS
+        self.metrics = metrics or ExportMetrics()
+        self.controller = controller or ConcurrencyController(self.workers)
+        self.bundle = bundle
+        self.compact = compact
+        self.fast_episodes = fast_episodes is not None
+        self.fast_extras = {key: sub for key, sub in plan_sub_resources("episode").items()
+                            if key in (fast_episodes or ())}
+        self.fallback_language = fallback_language
+        self.artwork = artwork
+        self.people_table = people_table
+        self.people_tables: Dict[str, PeopleTable] = {}
+        # 打包输出直接写入 SQLite，目录输出由后台线程写文件
+        self.writer = OutputWriter(fsync=fsync, metrics=self.metrics) if bundle is None else None
+        self.lock = threading.Lock()
+        self.manifests: Dict[str, Dict] = {}
+        self.written_files = 0
+        self.unchanged_files = 0
+        self.params = {"api_key": self.api_key, "language": "zh-CN"}
+        self.session = self._create_session()
+    
+    def _create_session(self) -> Optional[requests.Session]:
+        """创建请求使用的连接会话"""
+        session = requests.Session()
+        session.params = self.params
+        # 连接池大小与并发数一致，避免线程间争抢连接
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _map(self, func: Callable, items: List) -> List:
+        """在有界线程池中并发执行 func，结果按输入顺序返回"""
+        items = list(items)
+        if self.workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+            return list(pool.map(func, items))
+    
+    def _save_json(self, data: Dict, path: str):
+        """将数据写入 JSON 文件，增量模式下内容与上次写入一致时跳过
+        
+        所在目录有人物表时（--people-table 导出剧集），演职员先替换为引用
+        """
+        table = self.people_tables.get(os.path.dirname(path))
+        if table is not None:
+            data = table.normalize(data)
+            with table.lock:
+                table.saved.add(os.path.basename(path))
+        with self.metrics.stage("serialize"):
+            if self.compact:
+                text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            else:
+                text = json.dumps(data, indent=2, ensure_ascii=False)
+        if self.incremental:
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            files = self._manifest(os.path.dirname(path))["files"]
+            name = os.path.basename(path)
+            with self.lock:
+                unchanged = files.get(name) == digest
+                files[name] = digest
+            if unchanged and self._exists(path):
+                with self.lock:
+                    self.unchanged_files += 1
+                return
+        with self.metrics.stage("write_queue"):
+            self._write_text(path, text)
+        with self.lock:
+            self.written_files += 1
+    
+    def _makedirs(self, path: str):
+        """创建输出目录，打包输出时不需要"""
+        if self.bundle is None:
+            os.makedirs(path, exist_ok=True)
+    
+    def _write_text(self, path: str, text: str):
+        """写出一个输出文件（或打包文档），目录输出时交给后台线程写入"""
+        if self.bundle is not None:
+            self.bundle.put(path, text)
+            return
+        self.writer.submit(path, text)
+    
+    def flush(self):
+        """等待后台线程写完已提交的文件和图片，写入失败时抛出异常"""
+        if self.writer is not None:
+            self.writer.flush()
+        if self.artwork is not None:
+            self.artwork.wait()
+    
+    def close(self):
+        """写完已提交的文件和图片，停止写文件线程和图片下载器，关闭连接"""
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            if self.artwork is not None:
+                self.artwork.close()
+            if self.session is not None:
+                self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _queue_artwork(self, data: Optional[Dict], target_prefix: str):
+        """提交数据中的图片下载，文件保存为 {target_prefix}{类型}{扩展名}，下载与后续请求并行进行"""
+        if self.artwork is None or not data:
+            return
+        for kind, field in ARTWORK_FIELDS.items():
+            self.artwork.submit(kind, data.get(field), target_prefix)
+    
+    def _read_text(self, path: str) -> Optional[str]:
+        """读取之前写出的输出文件，不存在时返回 None"""
+        if self.bundle is not None:
+            return self.bundle.get(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _exists(self, path: str) -> bool:
+        if self.bundle is not None:
+            return self.bundle.exists(path)
+        return os.path.exists(path)
+    
+    def _manifest(self, output_dir: str) -> Dict:
+        """获取输出目录的增量清单，首次访问时从磁盘加载"""
+        with self.lock:
+            if output_dir not in self.manifests:
+                manifest = {"files": {}}
+                try:
+                    manifest = json.loads(self._read_text(os.path.join(output_dir, MANIFEST_FILE)))
+                except (TypeError, ValueError):
+                    pass
+                self.manifests[output_dir] = manifest
+            return self.manifests[output_dir]
+    
+    def release_manifests(self, prefix: str):
+        """丢弃 prefix 目录下已加载的增量清单，下次使用时重新从磁盘加载（服务模式任务结束后释放内存）"""
+        prefix = os.path.join(prefix, "")
+        with self.lock:
+            for output_dir in [d for d in self.manifests if os.path.join(d, "").startswith(prefix)]:
+                del self.manifests[output_dir]
+    
+    def _save_manifest(self, output_dir: str, **fields):
+        """更新并保存增量清单"""
+        manifest = self._manifest(output_dir)
+        manifest.update(fields)
+        self._write_text(os.path.join(output_dir, MANIFEST_FILE),
+                         json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True))
+        with self.lock:
+            print(f"增量导出: 写入 {self.written_files} 个文件，跳过 {self.unchanged_files} 个未变化文件")
+            self.written_files = 0
+            self.unchanged_files = 0
+    
+    def _open_people(self, output_dir: str):
+        """开始导出剧集时为该目录创建空的人物表"""
+        if not self.people_table:
+            return
+        with self.lock:
+            self.people_tables[output_dir] = PeopleTable()
+    
+    def _close_people(self, output_dir: str):
+        """剧集导出完成后写出人物表
+        
+        增量导出时，跳过的季的文档没有重写，其中引用的人物从上次的 people.json 中补入
+        """
+        with self.lock:
+            table = self.people_tables.pop(output_dir, None)
+        if table is None:
+            return
+        if self.incremental:
+            self._seed_people(table, output_dir)
+        self._save_json(table.to_dict(), os.path.join(output_dir, PEOPLE_FILE))
+        print(f"人物表已保存至: {os.path.join(output_dir, PEOPLE_FILE)}")
+    
+    def _seed_people(self, table: PeopleTable, output_dir: str):
+        """找出清单中本次没有写出的文档引用的人物，从上次的 people.json 补入人物表"""
+        try:
+            previous = json.loads(self._read_text(os.path.join(output_dir, PEOPLE_FILE)))
+        except (TypeError, ValueError):
+            return
+        files = self._manifest(output_dir)["files"]
+        with self.lock:
+            names = set(files)
+        skipped = names - table.saved - {PEOPLE_FILE}
+        ids = set()
+        for name in skipped:
+            try:
+                doc = json.loads(self._read_text(os.path.join(output_dir, name)))
+            except (TypeError, ValueError):
+                continue
+            credits = doc.get("credits") if isinstance(doc, dict) else None
+            for items in (credits.values() if isinstance(credits, dict) else ()):
+                if isinstance(items, list):
+                    ids.update(str(item["id"]) for item in items if isinstance(item, dict) and "id" in item)
+        table.seed(previous, ids)
+    
+    def _unchanged_seasons(self, tmdb_id: int, seasons: List[Dict], manifest: Dict, layout: Dict) -> set:
+        """根据 /tv/{id}/changes 找出自上次导出以来没有变化、可以跳过的季
+        
+        上次导出的布局参数不同、超出 changes 接口的查询范围或接口请求失败时全部重新导出；
+        集数与上次不同的季也会重新导出
+        """
+        params = self._changes_params(manifest, layout)
+        if params is None:
+            return set()
+        changes = self.fetch_data(f"/tv/{tmdb_id}/changes", params)
+        return self._unchanged_from_changes(changes, seasons, manifest)
+    
+    @staticmethod
+    def _changes_params(manifest: Dict, layout: Dict) -> Optional[Dict]:
+        """changes 接口的查询参数，无法使用 changes 接口判断时返回 None"""
+        last_export = manifest.get("exported_at")
+        if not last_export or manifest.get("layout") != layout or time.time() - last_export > CHANGES_WINDOW:
+            return None
+        return {"start_date": time.strftime("%Y-%m-%d", time.gmtime(last_export))}
+    
+    @staticmethod
+    def _unchanged_from_changes(changes: Optional[Dict], seasons: List[Dict], manifest: Dict) -> set:
+        """根据 changes 接口的响应和清单中记录的集数找出未变化的季"""
+        if changes is None:
+            return set()
+        
+        changed = set()
+        for change in changes.get("changes", []):
+            if change.get("key") != "season":
+                continue
+            for item in change.get("items", []):
+                value = item.get("value") or item.get("original_value")
+                if isinstance(value, dict) and "season_number" in value:
+                    changed.add(value["season_number"])
+        
+        episode_counts = manifest.get("episode_counts", {})
+        return {s["season_number"] for s in seasons
+                if s["season_number"] not in changed
+                and episode_counts.get(str(s["season_number"])) == s.get("episode_count")}
+        
+    def _lookup_cache(self, endpoint: str, params: Dict) -> Tuple[Optional[str], Optional[CacheEntry], bool]:
+        """查询缓存，返回 (缓存键, 缓存条目, 是否可直接使用)"""
+        if not self.cache:
+            return None, None, False
+        cache_key = self.cache.make_key(endpoint, params, self.params.get("language"))
+        cached = self.cache.get(cache_key)
+        usable = bool(cached) and (self.offline or (cached.fresh and not self.refresh))
+        if usable:
+            self.metrics.record_cache(endpoint, "hit")
+        return cache_key, cached, usable
+    
+    def _record_response(self, endpoint: str, started: float, status: Optional[int],
+                         size: int = 0, headers: Optional[Mapping[str, str]] = None):
+        """记录请求结果并反馈给并发控制器，status 为 None 表示网络错误"""
+        latency = time.perf_counter() - started
+        self.metrics.record_request(endpoint, latency, str(status) if status else "error", size)
+        self.controller.release(status, latency, parse_retry_after(headers))
+        self.metrics.set_gauge("concurrency_limit", self.controller.limit)
+        self.metrics.set_gauge("circuit_breaker_trips", self.controller.trips)
+    
+    def fetch_data(self, endpoint: str, params: Optional[Dict] = None, max_retries: int = 5) -> Optional[Dict]:
+        """带指数退避重试机制的请求函数"""
+        url = f"{self.base_url}{endpoint}"
+        params = params or {}
+        retries = 0
+        delay = 1
+        
+        # 查询缓存
+        cache_key, cached, usable = self._lookup_cache(endpoint, params)
+        if usable:
+            return cached.data
+        if self.offline:
+            print(f"错误: 离线模式下缓存中没有 {endpoint}")
+            return None
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else {}
+        
+        while retries < max_retries:
+            with self.metrics.stage("concurrency_wait"):
+                self.controller.acquire()
+            with self.metrics.stage("rate_limit_wait"):
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers=headers)
+                self._record_response(endpoint, started, response.status_code,
+                                      len(response.content), response.headers)
+                if response.status_code == 304 and cached:
+                    self.metrics.record_cache(endpoint, "revalidated")
+                    self.cache.touch(cache_key, endpoint)
+                    return cached.data
+                if is_permanent_error(response.status_code):
+                    print(f"请求失败: HTTP {response.status_code} {endpoint}，不再重试")
+                    return None
+                response.raise_for_status()
+                data = response.json()
+                if self.cache:
+                    self.cache.put(cache_key, endpoint, response.content, response.headers.get("ETag"))
+                return data
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                print(f"请求失败: {e} (尝试 {retries+1}/{max_retries})")
+                if response is None:
+                    self._record_response(endpoint, started, None)
+                retry_after = parse_retry_after(response.headers if response is not None else None)
+                if retry_after is not None:
+                    # 服务端指定了等待时间：暂停所有线程，由限速器统一等待
+                    self.rate_limiter.pause(retry_after)
+                    backoff = retry_after
+                elif self.controller.tripped:
+                    # 熔断期间由并发控制器统一等待，不再各自退避
+                    backoff = 0.0
+                else:
+                    time.sleep(delay)
+                    backoff = delay
+                self.metrics.record_retry(endpoint, backoff)
+                delay *= 2
+                retries += 1
+        if cached:
+            self.metrics.record_cache(endpoint, "stale")
+            print(f"警告: 无法获取数据 {endpoint}，使用过期缓存")
+            return cached.data
+        print(f"错误: 无法获取数据 {endpoint}")
+        return None
+    
+    def fetch_object(self, kind: str, endpoint: str) -> Optional[Dict]:
+        """通过 append_to_response 一次请求获取对象及模板所需的全部子资源
+        
+        返回的数据中子资源已转换为模板字段的结构，可直接交给 project
+        """
+        data = self.fetch_data(endpoint, append_params(kind))
+        if not data:
+            return None
+        return self._intern(split_sub_resources(kind, data))
+    
+    def _intern(self, data: Dict) -> Dict:
+        """使用人物表时驻留对象中的字符串：季数据在导出剧集期间一直保存在内存中，
+        由它投影、构造出的季和集文档也共用这些字符串"""
+        return intern_strings(data) if self.people_table else data
+    
+    def project(self, kind: str, data: Dict) -> Dict:
+        """用预编译的投影函数按 TEMPLATES[kind] 过滤数据"""
+        with self.metrics.stage("project"):
+            return self.projections[kind](data)
+    
+    def filter_data(self, data: Dict, template: Dict) -> Dict:
+        """根据任意模板过滤数据（逐层遍历模板；导出时使用预编译的 project）"""
+        filtered = {}
+        for key, default in template.items():
+            if key in data:
+                # 处理嵌套结构
+                if isinstance(default, dict) and isinstance(data[key], dict):
+                    filtered[key] = self.filter_data(data[key], default)
+                # 处理空值
+                elif data[key] is None:
+                    filtered[key] = default
+                else:
+                    filtered[key] = data[key]
+            else:
+                filtered[key] = default
+        return filtered
+    
+    def _translation(self, endpoint: str) -> Optional[Dict]:
+        """对象在回退语言中的文本，/translations 一次请求返回所有语言"""
+        return pick_translation(self.fetch_data(f"{endpoint}/translations"), self.fallback_language)
+    
+    def _with_fallback(self, kind: str, filtered: Dict, endpoint: str) -> Dict:
+        """过滤后的电影、剧集或合集有空的可翻译字段时，用回退语言补全（原地修改并返回）"""
+        if self.fallback_language and missing_text(kind, filtered):
+            fill_missing_text(kind, filtered, self._translation(endpoint))
+        return filtered
+    
+    def _needs_fallback(self, season_data: Optional[Dict], include_season: bool = True) -> bool:
+        """季本身（include_season 时）或季中任一集的可翻译字段为空"""
+        if not self.fallback_language or not season_data:
+            return False
+        if include_season and missing_text("season", season_data):
+            return True
+        return any(missing_text("episode", entry) for entry in season_data.get("episodes", []))
+    
+    def _season_fallbacks(self, series_id: int, season_nums: List[int], season_payloads: List[Optional[Dict]],
+                          include_season: bool = True) -> Dict[int, Dict]:
+        """并发以回退语言获取缺少文本的季 {原始季号: 回退语言的季数据}
+        
+        季数据中包含所有集的名称和简介，每季一次请求即可补全该季及其所有集
+        """
+        needed = [num for num, data in zip(season_nums, season_payloads)
+                  if self._needs_fallback(data, include_season)]
+        payloads = self._map(lambda num: self.fetch_data(f"/tv/{series_id}/season/{num}",
+                                                         {"language": self.fallback_language}), needed)
+        return {num: data for num, data in zip(needed, payloads) if data}
+    
+    def _type_candidates(self, tmdb_id: int) -> List[Tuple[str, Callable]]:
+        """自动检测时依次尝试的类型及获取函数，请求与各导出方法相同，结果可直接复用"""
+        return [
+            ("movie", lambda: self.fetch_object("movie", f"/movie/{tmdb_id}")),
+            ("tv", lambda: self.fetch_object("series", f"/tv/{tmdb_id}")),
+            ("collection", lambda: self.fetch_data(f"/collection/{tmdb_id}"))
+        ]
+    
+    def detect_type(self, tmdb_id: int) -> Tuple[Optional[str], Optional[Dict]]:
+        """自动检测内容类型，同一 ID 存在多种类型时按 电影、剧集、合集 的顺序优先
+        
+        多线程时并发请求所有候选类型，单线程时依次请求、找到即停；404 不重试
+        
+        返回: (类型, 已获取的数据)，都不存在时为 (None, None)
+        """
+        candidates = self._type_candidates(tmdb_id)
+        if self.workers <= 1:
+            for content_type, fetch in candidates:
+                data = fetch()
+                if data:
+                    return content_type, data
+            return None, None
+        payloads = self._map(lambda candidate: candidate[1](), candidates)
+        for (content_type, _), data in zip(candidates, payloads):
+            if data:
+                return content_type, data
+        return None, None
+    
+    def export_movie(self, tmdb_id: int, output_dir: str, data: Optional[Dict] = None) -> bool:
+        """导出电影元数据
+        
+        Args:
+            data: 已获取的电影数据（如类型检测的结果），为 None 时重新获取
+        
+        返回: 是否成功导出
+        """
+        print(f"\n开始导出电影 ID: {tmdb_id}")
+        self._makedirs(output_dir)
+        
+        # 获取基础数据及附加数据
+        combined = data or self.fetch_object("movie", f"/movie/{tmdb_id}")
+        if not combined:
+            print(f"错误: 无法获取电影基础数据 (ID: {tmdb_id})")
+            return False
+        
+        # 过滤并保存
+        filtered = self._with_fallback("movie", self.project("movie", combined), f"/movie/{tmdb_id}")
+        self._save_json(filtered, os.path.join(output_dir, "all.json"))
+        self._queue_artwork(combined, os.path.join(output_dir, ""))
+        print(f"电影数据已保存至: {os.path.join(output_dir, 'all.json')}")
+        if self.incremental:
+            self._save_manifest(output_dir, exported_at=time.time())
+        self.flush()
+        return True
+    
+    def export_series(self, tmdb_id: int, output_dir: str, 
+                     combine_seasons: bool = False, 
+                     season_mapping: Optional[Dict[int, int]] = None,
+                     data: Optional[Dict] = None) -> bool:
+        """导出剧集元数据
+        
+        Args:
+            combine_seasons: 是否将所有季合并为一季
+            season_mapping: 季号映射字典 {原始季号: 目标季号}
+            data: 已获取的剧集数据（如类型检测的结果），为 None 时重新获取
+            
+        返回: 是否所有季和集都成功导出
+        """
+        print(f"\n开始导出剧集 ID: {tmdb_id}")
+        self._makedirs(output_dir)
+        started_at = time.time()
+        
+        # 获取剧集基础数据及附加数据
+        series_data = data or self.fetch_object("series", f"/tv/{tmdb_id}")
+        if not series_data:
+            print(f"错误: 无法获取剧集基础数据 (ID: {tmdb_id})")
+            return False
+        self._open_people(output_dir)
+        
+        # 过滤并保存剧集数据
+        filtered_series = self._with_fallback("series", self.project("series", series_data), f"/tv/{tmdb_id}")
+        self._save_json(filtered_series, os.path.join(output_dir, "series.json"))
+        self._queue_artwork(series_data, os.path.join(output_dir, ""))
+        print(f"剧集数据已保存至: {os.path.join(output_dir, 'series.json')}")
+        
+        # 导出所有季
+        seasons = [s for s in series_data.get("seasons", []) if s.get("season_number", 0) > 0]
+        
+        # 增量模式：跳过自上次导出以来没有变化的季
+        layout = self._series_layout(combine_seasons, season_mapping)
+        unchanged = set()
+        episode_counts = {}
+        if self.incremental:
+            manifest = self._manifest(output_dir)
+            unchanged = self._unchanged_seasons(tmdb_id, seasons, manifest, layout)
+            episode_counts = {k: v for k, v in manifest.get("episode_counts", {}).items()
+                              if int(k) in unchanged}
+            if unchanged:
+                print(f"增量导出: 跳过未变化的季 {sorted(unchanged)}")
+        
+        if combine_seasons:
+            if not seasons or len(unchanged) < len(seasons):
+                print(f"合并所有季为一季")
+                episode_counts = self.export_combined_seasons(tmdb_id, seasons, output_dir, season_mapping)
+        else:
+            plan = self._season_plan(seasons, unchanged, season_mapping)
+            
+            # 先并发获取所有季，再把所有集放进同一个线程池，避免线程池嵌套
+            season_payloads = self._map(lambda p: self._fetch_season(tmdb_id, p[0]), plan)
+            fallbacks = self._season_fallbacks(tmdb_id, [p[0] for p in plan], season_payloads)
+            episode_jobs = []
+            for (orig_season_num, target_season_num), season_data in zip(plan, season_payloads):
+                print(f"  导出季 #{orig_season_num} -> 季 #{target_season_num}")
+                if not season_data:
+                    print(f"警告: 无法获取季数据 (季: {orig_season_num})")
+                    continue
+                self._save_season(season_data, output_dir, target_season_num, fallbacks.get(orig_season_num))
+                for episode in season_data.get("episodes", []):
+                    episode_jobs.append((orig_season_num, episode["episode_number"], target_season_num))
+            
+            payloads = {orig_season_num: season_data for (orig_season_num, _), season_data in zip(plan, season_payloads)}
+            results = self._map(lambda job: self._export_episode(tmdb_id, job[0], job[1], output_dir,
+                                                                 target_season=job[2],
+                                                                 season_data=payloads[job[0]],
+                                                                 fallback=fallbacks.get(job[0])), episode_jobs)
+            
+            episode_counts.update(self._complete_seasons(plan, season_payloads, episode_jobs, results))
+        
+        self._close_people(output_dir)
+        if self.incremental:
+            self._save_manifest(output_dir, exported_at=started_at, layout=layout,
+                                episode_counts=episode_counts)
+        self.flush()
+        return len(episode_counts) == len(seasons)
+    
+    def _series_layout(self, combine_seasons: bool, season_mapping: Optional[Dict[int, int]]) -> Dict:
+        """影响输出文件布局和内容的参数，记录在增量清单中（与 JSON 往返后的形式一致）
+        
+        任一参数与上次导出不同时不跳过任何季，避免新旧两种格式的文件混在一起
+        """
+        layout = {"combine_seasons": combine_seasons,
+                  "season_mapping": sorted((season_mapping or {}).items()),
+                  "item_fields": sorted((path, list(fields)) for path, fields in self.item_fields.items()),
+                  "fast_episodes": sorted(self.fast_extras) if self.fast_episodes else None,
+                  "fallback_language": self.fallback_language,
+                  "people_table": self.people_table,
+                  "compact": self.compact}
+        return json.loads(json.dumps(layout))
+    
+    @staticmethod
+    def _season_plan(seasons: List[Dict], unchanged: set,
+                     season_mapping: Optional[Dict[int, int]]) -> List[Tuple[int, int]]:
+        """需要导出的季 [(原始季号, 目标季号)]"""
+        plan = []
+        for season in seasons:
+            orig_season_num = season["season_number"]
+            if orig_season_num in unchanged:
+                continue
+            target_season_num = season_mapping.get(orig_season_num, orig_season_num) if season_mapping else orig_season_num
+            plan.append((orig_season_num, target_season_num))
+        return plan
+    
+    @staticmethod
+    def _complete_seasons(plan: List[Tuple[int, int]], season_payloads: List[Optional[Dict]],
+                          episode_jobs: List[Tuple[int, int, int]], results: List[bool]) -> Dict[str, int]:
+        """找出季数据和所有集都导出成功的季 {原始季号: 集数}"""
+        exported = defaultdict(int)
+        failed = set()
+        for (orig_season_num, _, _), success in zip(episode_jobs, results):
+            if success:
+                exported[orig_season_num] += 1
+            else:
+                failed.add(orig_season_num)
+        return {str(orig_season_num): exported[orig_season_num]
+                for (orig_season_num, _), season_data in zip(plan, season_payloads)
+                if season_data and orig_season_num not in failed}
+    
+    @staticmethod
+    def _combined_season(seasons: List[Dict]) -> Dict:
+        """合并所有季时使用的季元数据"""
+        return {
+            "name": "全集",
+            "overview": "所有季合并",
+            "air_date": seasons[0]["air_date"] if seasons else "1970-01-01T00:00:00.000Z",
+            "external_ids": {"tvdb_id": None},
+            "credits": {"cast": [], "crew": []}
+        }
+    
+    def export_combined_seasons(self, series_id: int, seasons: List[Dict], output_dir: str, 
+                              season_mapping: Optional[Dict[int, int]] = None) -> Dict[str, int]:
+        """将所有季合并为一季导出
+        
+        返回: 所有集都导出成功的季 {原始季号: 集数}
+        """
+        # 确定目标季号
+        target_season_num = season_mapping.get(1, 1) if season_mapping else 1
+        
+        # 保存合并后的季数据
+        season_file = os.path.join(output_dir, f"season-{target_season_num}.json")
+        self._save_json(self._combined_season(seasons), season_file)
+        print(f"合并季数据已保存至: {season_file}")
+        
+        # 并发获取所有季的集列表（快速模式下附带季的演职员，用于构造集数据）
+        if self.fast_episodes:
+            season_payloads = self._map(lambda s: self._fetch_season(series_id, s["season_number"]), seasons)
+        else:
+            season_payloads = self._map(
+                lambda s: self.fetch_data(f"/tv/{series_id}/season/{s['season_number']}"), seasons)
+        fallbacks = self._season_fallbacks(series_id, [s["season_number"] for s in seasons], season_payloads,
+                                           include_season=False)
+        episode_jobs = []
+        complete = {}
+        for season, season_data in zip(seasons, season_payloads):
+            if not season_data:
+                print(f"警告: 无法获取季数据 (季: {season['season_number']})")
+                continue
+            complete[str(season["season_number"])] = len(season_data.get("episodes", []))
+            for episode in season_data.get("episodes", []):
+                episode_jobs.append((season["season_number"], episode["episode_number"]))
+        
+        # 并发获取所有集，完成顺序不定，但编号按原始季集顺序分配，只计入成功的集
+        payloads = {season["season_number"]: season_data for season, season_data in zip(seasons, season_payloads)}
+        episodes = self._map(lambda job: self._fetch_episode(series_id, job[0], job[1], payloads[job[0]],
+                                                             fallbacks.get(job[0])), episode_jobs)
+        self._save_combined_episodes(episode_jobs, episodes, output_dir, target_season_num, complete, payloads)
+        return complete
+    
+    def _save_combined_episodes(self, episode_jobs: List[Tuple[int, int]], episodes: List[Optional[Dict]],
+                                output_dir: str, target_season_num: int, complete: Dict[str, int],
+                                season_payloads: Optional[Dict[int, Dict]] = None):
+        """按原始季集顺序为合并后的集重新编号并保存，导出失败的集所在的季从 complete 中移除
+        
+        season_payloads 为 {原始季号: 季数据}，用来查找剧照
+        """
+        global_episode_number = 1
+        for (season_number, episode_number), filtered_episode in zip(episode_jobs, episodes):
+            if filtered_episode is None:
+                complete.pop(str(season_number), None)
+                continue
+            filename = self._episode_filename(season_number, episode_number,
+                                              target_season_num, global_episode_number)
+            print(f"    导出集: S{season_number}E{episode_number} -> {filename}")
+            self._save_json(filtered_episode, os.path.join(output_dir, filename))
+            self._queue_artwork(self._season_entry((season_payloads or {}).get(season_number), episode_number),
+                                os.path.join(output_dir, filename[:-len(".json")] + "-"))
+            global_episode_number += 1
+    
+    def _fetch_season(self, series_id: int, season_num: int) -> Optional[Dict]:
+        """获取季数据及其附加数据，返回未过滤的合并结果（含 episodes 列表）"""
+        return self.fetch_object("season", f"/tv/{series_id}/season/{season_num}")
+    
+    def _save_season(self, season_data: Dict, output_dir: str, target_season_num: int,
+                     fallback: Optional[Dict] = None):
+        """过滤并保存季数据，fallback 为回退语言的季数据"""
+        filtered_season = fill_missing_text("season", self.project("season", season_data), fallback)
+        self._save_json(filtered_season, os.path.join(output_dir, f"season-{target_season_num}.json"))
+        self._queue_artwork(season_data, os.path.join(output_dir, f"season-{target_season_num}-"))
+    
+    def export_season(self, series_id: int, orig_season_num: int, output_dir: str, target_season_num: int):
+        """导出单季元数据
+        
+        Args:
+            orig_season_num: TMDB中的原始季号
+            target_season_num: 要导出为的目标季号
+        """
+        print(f"  导出季 #{orig_season_num} -> 季 #{target_season_num}")
+        
+        # 获取季数据
+        season_data = self._fetch_season(series_id, orig_season_num)
+        if not season_data:
+            print(f"警告: 无法获取季数据 (季: {orig_season_num})")
+            return
+        
+        fallback = self._season_fallbacks(series_id, [orig_season_num], [season_data]).get(orig_season_num)
+        self._save_season(season_data, output_dir, target_season_num, fallback)
+        
+        # 并发导出所有集
+        episode_numbers = [episode["episode_number"] for episode in season_data.get("episodes", [])]
+        self._map(lambda n: self._export_episode(series_id, orig_season_num, n, output_dir,
+                                                 target_season=target_season_num, season_data=season_data,
+                                                 fallback=fallback),
+                  episode_numbers)
+        self.flush()
+    
+    @staticmethod
+    def _episode_filename(orig_season_num: int, orig_episode_num: int,
+                          target_season: Optional[int] = None,
+                          target_episode: Optional[int] = None) -> str:
+        """确定集文件名"""
+        if target_season is not None and target_episode is not None:
+            return f"season-{target_season}-episode-{target_episode}.json"
+        elif target_season is not None:
+            return f"season-{target_season}-episode-{orig_episode_num}.json"
+        else:
+            return f"season-{orig_season_num}-episode-{orig_episode_num}.json"
+    
+    @staticmethod
+    def _season_entry(season_data: Optional[Dict], episode_num: int) -> Optional[Dict]:
+        """季数据 episodes 列表中的指定集"""
+        for entry in (season_data or {}).get("episodes", []):
+            if entry.get("episode_number") == episode_num:
+                return entry
+        return None
+    
+    def _fast_extra_params(self) -> Dict[str, str]:
+        """快速模式下逐集补充请求的 append_to_response 参数"""
+        return {"append_to_response": ",".join(sorted({name for name, _ in self.fast_extras.values()}))}
+    
+    def _episode_from_season(self, entry: Dict, season_data: Dict, extras: Optional[Dict] = None) -> Dict:
+        """用季数据中的集条目构造单集数据（未过滤）
+        
+        集条目已包含名称、简介、播出日期、评分、客串演员和职员；演员表使用季的演员表，
+        季数据中没有的字段只在 fast_extras 指定时从 extras（逐集请求的响应）中取得，否则使用模板默认值
+        """
+        data = dict(entry)
+        data["credits"] = {"cast": (season_data.get("credits") or {}).get("cast", []),
+                           "guest_stars": entry.get("guest_stars") or [],
+                           "crew": entry.get("crew") or []}
+        for key, (name, convert) in self.fast_extras.items():
+            data[key] = convert((extras or {}).get(name) or {})
+        return data
+    
+    def _fetch_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int,
+                       season_data: Optional[Dict] = None, fallback: Optional[Dict] = None) -> Optional[Dict]:
+        """获取单集数据及其附加数据，返回过滤后的结果，失败时返回 None
+        
+        快速模式下传入 season_data 时由季数据构造，只为 fast_extras 中的字段请求一次；
+        fallback 为回退语言的季数据，用来补全为空的名称和简介
+        """
+        endpoint = f"/tv/{series_id}/season/{orig_season_num}/episode/{orig_episode_num}"
+        entry = self._season_entry(season_data, orig_episode_num) if self.fast_episodes else None
+        if entry is not None:
+            extras = None
+            if self.fast_extras:
+                extras = self.fetch_data(endpoint, self._fast_extra_params())
+                if not extras:
+                    print(f"警告: 无法获取集数据 (S{orig_season_num}E{orig_episode_num})")
+                    return None
+            combined = self._episode_from_season(entry, season_data, extras)
+        else:
+            combined = self.fetch_object("episode", endpoint)
+            if not combined:
+                print(f"警告: 无法获取集数据 (S{orig_season_num}E{orig_episode_num})")
+                return None
         
-    def fetch_data(self, endpoint: str, params: Optional[Dict] = None, max_retries: int = 5) -> Optional[Dict]:
-        """带指数退避重试机制的请求函数"""
+        return fill_missing_text("episode", self.project("episode", combined),
+                                 self._season_entry(fallback, orig_episode_num))
+    
+    def export_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int, 
+                      output_dir: str, target_season: Optional[int] = None, 
+                      target_episode: Optional[int] = None, season_data: Optional[Dict] = None,
+                      fallback: Optional[Dict] = None) -> bool:
+        """导出单集元数据
+        
+        Args:
+            orig_season_num: TMDB中的原始季号
+            orig_episode_num: TMDB中的原始集号
+            target_season: 要导出为的目标季号
+            target_episode: 要导出为的目标集号
+            season_data: 所在季的数据，快速模式下用来构造集数据
+            fallback: 所在季在回退语言中的数据，用来补全为空的名称和简介
+            
+        返回: 是否成功导出
+        """
+        success = self._export_episode(series_id, orig_season_num, orig_episode_num, output_dir,
+                                       target_season, target_episode, season_data, fallback)
+        self.flush()
+        return success
+    
+    def _export_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int,
+                        output_dir: str, target_season: Optional[int] = None,
+                        target_episode: Optional[int] = None, season_data: Optional[Dict] = None,
+                        fallback: Optional[Dict] = None) -> bool:
+        """导出单集，文件交给写线程后立即返回，供批量导出集时使用（由调用方统一 flush）"""
+        filename = self._episode_filename(orig_season_num, orig_episode_num, target_season, target_episode)
+        print(f"    导出集: S{orig_season_num}E{orig_episode_num} -> {filename}")
+        
+        filtered_episode = self._fetch_episode(series_id, orig_season_num, orig_episode_num, season_data, fallback)
+        if filtered_episode is None:
+            return False
+        
+        # 保存，剧照路径取自季数据中的集条目
+        self._save_json(filtered_episode, os.path.join(output_dir, filename))
+        self._queue_artwork(self._season_entry(season_data, orig_episode_num),
+                            os.path.join(output_dir, filename[:-len(".json")] + "-"))
+        return True
+    
+    def export_collection(self, tmdb_id: int, output_dir: str, data: Optional[Dict] = None) -> bool:
+        """导出合集元数据
+        
+        Args:
+            data: 已获取的合集数据（如类型检测的结果），为 None 时重新获取
+        
+        返回: 是否成功导出
+        """
+        print(f"\n开始导出合集 ID: {tmdb_id}")
+        self._makedirs(output_dir)
+        
+        collection_data = data or self.fetch_data(f"/collection/{tmdb_id}")
+        if not collection_data:
+            print(f"错误: 无法获取合集数据 (ID: {tmdb_id})")
+            return False
+        
+        filtered = self._with_fallback("collection", self.project("collection", collection_data),
+                                       f"/collection/{tmdb_id}")
+        self._save_json(filtered, os.path.join(output_dir, "all.json"))
+        self._queue_artwork(collection_data, os.path.join(output_dir, ""))
+        print(f"合集数据已保存至: {os.path.join(output_dir, 'all.json')}")
+        if self.incremental:
+            self._save_manifest(output_dir, exported_at=time.time())
+        self.flush()
+        return True
+
+
+class AsyncTMDBExporter(TMDBExporter):
+    """基于 asyncio + aiohttp 的导出器
+    
+    导出方法均为协程，过滤、文件命名、增量清单等逻辑与 TMDBExporter 共用，
+    输出与同步版本逐字节一致。并发请求数由信号量限制，重试等待不阻塞事件循环，
+    文件写入在线程中执行。需要在 ``async with`` 中使用::
+    
+        async with AsyncTMDBExporter(api_key, workers=64) as exporter:
+            await exporter.export_series(tmdb_id, output_dir)
+    """
+    def __init__(self, api_key: str, api_version: str = "v3", workers: int = 16, **kwargs):
+        if aiohttp is None:
+            raise RuntimeError("异步后端需要安装 aiohttp: pip install aiohttp")
+        super().__init__(api_key, api_version, workers=workers, **kwargs)
+        self.http = None
+        self.semaphore = None
+    
+    def _create_session(self) -> Optional[requests.Session]:
+        """请求由 __aenter__ 中创建的 aiohttp 会话发出，不需要 requests 会话"""
+        return None
+    
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.workers)
+        self.http = aiohttp.ClientSession(connector=connector)
+        self.semaphore = asyncio.Semaphore(self.workers)
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        try:
+            await self.http.close()
+        finally:
+            await asyncio.to_thread(self.close)
+    
+    async def _gather(self, func: Callable, items: List) -> List:
+        """并发执行协程函数，结果按输入顺序返回"""
+        return list(await asyncio.gather(*(func(item) for item in items)))
+    
+    async def fetch_data(self, endpoint: str, params: Optional[Dict] = None, max_retries: int = 5) -> Optional[Dict]:
+        """带指数退避重试机制的请求协程"""
         url = f"{self.base_url}{endpoint}"
+        params = params or {}
         retries = 0
         delay = 1
         
+        # 查询缓存（SQLite 读写在线程中执行，不阻塞事件循环）
+        cache_key, cached, usable = await asyncio.to_thread(self._lookup_cache, endpoint, params)
+        if usable:
+            return cached.data
+        if self.offline:
+            print(f"错误: 离线模式下缓存中没有 {endpoint}")
+            return None
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else {}
+        query = {**self.params, **params}
+        
         while retries < max_retries:
+            with self.metrics.stage("concurrency_wait"):
+                await self.controller.acquire_async()
+            with self.metrics.stage("rate_limit_wait"):
+                await self.rate_limiter.acquire_async()
+            started = time.perf_counter()
+            recorded = False
             try:
-                response = self.session.get(url, params=params or {})
-                response.raise_for_status()
-                return response.json()
-            except (requests.RequestException, json.JSONDecodeError) as e:
+                async with self.semaphore:
+                    started = time.perf_counter()
+                    async with self.http.get(url, params=query, headers=headers) as response:
+                        body = await response.read()
+                        self._record_response(endpoint, started, response.status, len(body), response.headers)
+                        recorded = True
+                        if response.status == 304 and cached:
+                            self.metrics.record_cache(endpoint, "revalidated")
+                            await asyncio.to_thread(self.cache.touch, cache_key, endpoint)
+                            return cached.data
+                        if is_permanent_error(response.status):
+                            print(f"请求失败: HTTP {response.status} {endpoint}，不再重试")
+                            return None
+                        response.raise_for_status()
+                        etag = response.headers.get("ETag")
+                data = json.loads(body)
+                if self.cache:
+                    await asyncio.to_thread(self.cache.put, cache_key, endpoint, body, etag)
+                return data
+            except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
                 print(f"请求失败: {e} (尝试 {retries+1}/{max_retries})")
-                time.sleep(delay)
+                if not recorded:
+                    self._record_response(endpoint, started, None)
+                retry_after = parse_retry_after(getattr(e, "headers", None))
+                if retry_after is not None:
+                    # 服务端指定了等待时间：暂停所有请求，由限速器统一等待
+                    self.rate_limiter.pause(retry_after)
+                    backoff = retry_after
+                elif self.controller.tripped:
+                    # 熔断期间由并发控制器统一等待，不再各自退避
+                    backoff = 0.0
+                else:
+                    await asyncio.sleep(delay)
+                    backoff = delay
+                self.metrics.record_retry(endpoint, backoff)
                 delay *= 2
                 retries += 1
+        if cached:
+            self.metrics.record_cache(endpoint, "stale")
+            print(f"警告: 无法获取数据 {endpoint}，使用过期缓存")
+            return cached.data
         print(f"错误: 无法获取数据 {endpoint}")
         return None
     
-    def filter_data(self, data: Dict, template: Dict) -> Dict:
-        """根据模板过滤数据"""
-        filtered = {}
-        for key, default in template.items():
-            if key in data:
-                # 处理嵌套结构
-                if isinstance(default, dict) and isinstance(data[key], dict):
-                    filtered[key] = self.filter_data(data[key], default)
-                # 处理空值
-                elif data[key] is None:
-                    filtered[key] = default
-                else:
-                    filtered[key] = data[key]
-            else:
-                filtered[key] = default
+    async def fetch_object(self, kind: str, endpoint: str) -> Optional[Dict]:
+        """通过 append_to_response 一次请求获取对象及模板所需的全部子资源"""
+        data = await self.fetch_data(endpoint, append_params(kind))
+        if not data:
+            return None
+        return self._intern(split_sub_resources(kind, data))
+    
+    async def _translation(self, endpoint: str) -> Optional[Dict]:
+        return pick_translation(await self.fetch_data(f"{endpoint}/translations"), self.fallback_language)
+    
+    async def _with_fallback(self, kind: str, filtered: Dict, endpoint: str) -> Dict:
+        if self.fallback_language and missing_text(kind, filtered):
+            fill_missing_text(kind, filtered, await self._translation(endpoint))
         return filtered
     
-    def export_movie(self, tmdb_id: int, output_dir: str):
+    async def _season_fallbacks(self, series_id: int, season_nums: List[int],
+                                season_payloads: List[Optional[Dict]], include_season: bool = True) -> Dict[int, Dict]:
+        needed = [num for num, data in zip(season_nums, season_payloads)
+                  if self._needs_fallback(data, include_season)]
+        payloads = await self._gather(lambda num: self.fetch_data(f"/tv/{series_id}/season/{num}",
+                                                                  {"language": self.fallback_language}), needed)
+        return {num: data for num, data in zip(needed, payloads) if data}
+    
+    async def _unchanged_seasons(self, tmdb_id: int, seasons: List[Dict], manifest: Dict, layout: Dict) -> set:
+        params = self._changes_params(manifest, layout)
+        if params is None:
+            return set()
+        changes = await self.fetch_data(f"/tv/{tmdb_id}/changes", params)
+        return self._unchanged_from_changes(changes, seasons, manifest)
+    
+    async def detect_type(self, tmdb_id: int) -> Tuple[Optional[str], Optional[Dict]]:
+        """自动检测内容类型，并发请求所有候选类型，规则与 TMDBExporter.detect_type 相同"""
+        candidates = self._type_candidates(tmdb_id)
+        payloads = await asyncio.gather(*(fetch() for _, fetch in candidates))
+        for (content_type, _), data in zip(candidates, payloads):
+            if data:
+                return content_type, data
+        return None, None
+    
+    async def export_movie(self, tmdb_id: int, output_dir: str, data: Optional[Dict] = None) -> bool:
         """导出电影元数据"""
         print(f"\n开始导出电影 ID: {tmdb_id}")
-        os.makedirs(output_dir, exist_ok=True)
+        self._makedirs(output_dir)
         
-        # 获取基础数据
-        movie_data = self.fetch_data(f"/movie/{tmdb_id}")
-        if not movie_data:
+        combined = data or await self.fetch_object("movie", f"/movie/{tmdb_id}")
+        if not combined:
             print(f"错误: 无法获取电影基础数据 (ID: {tmdb_id})")
-            return
-        
-        # 获取额外数据
-        credits = self.fetch_data(f"/movie/{tmdb_id}/credits") or {}
-        releases = self.fetch_data(f"/movie/{tmdb_id}/release_dates") or {}
-        videos = self.fetch_data(f"/movie/{tmdb_id}/videos") or {}
-        
-        # 合并数据
-        combined = {
-            **movie_data,
-            "casts": credits,
-            "releases": {"countries": [r for r in releases.get("results", [])]},
-            "trailers": {"youtube": [v for v in videos.get("results", []) if v.get("site") == "YouTube"]}
-        }
+            return False
         
-        # 过滤并保存
-        filtered = self.filter_data(combined, TEMPLATES["movie"])
-        with open(os.path.join(output_dir, "all.json"), "w", encoding="utf-8") as f:
-            json.dump(filtered, f, indent=2, ensure_ascii=False)
+        filtered = await self._with_fallback("movie", self.project("movie", combined), f"/movie/{tmdb_id}")
+        await asyncio.to_thread(self._save_json, filtered, os.path.join(output_dir, "all.json"))
+        self._queue_artwork(combined, os.path.join(output_dir, ""))
         print(f"电影数据已保存至: {os.path.join(output_dir, 'all.json')}")
+        if self.incremental:
+            await asyncio.to_thread(self._save_manifest, output_dir, exported_at=time.time())
+        await asyncio.to_thread(self.flush)
+        return True
     
-    def export_series(self, tmdb_id: int, output_dir: str, 
-                     combine_seasons: bool = False, 
-                     season_mapping: Optional[Dict[int, int]] = None):
-        """导出剧集元数据
-        
-        Args:
-            combine_seasons: 是否将所有季合并为一季
-            season_mapping: 季号映射字典 {原始季号: 目标季号}
-        """
+    async def export_series(self, tmdb_id: int, output_dir: str,
+                            combine_seasons: bool = False,
+                            season_mapping: Optional[Dict[int, int]] = None,
+                            data: Optional[Dict] = None) -> bool:
+        """导出剧集元数据，参数与 TMDBExporter.export_series 相同"""
         print(f"\n开始导出剧集 ID: {tmdb_id}")
-        os.makedirs(output_dir, exist_ok=True)
+        self._makedirs(output_dir)
+        started_at = time.time()
         
-        # 获取剧集基础数据
-        series_data = self.fetch_data(f"/tv/{tmdb_id}")
+        series_data = data or await self.fetch_object("series", f"/tv/{tmdb_id}")
         if not series_data:
             print(f"错误: 无法获取剧集基础数据 (ID: {tmdb_id})")
-            return
-        
-        # 获取额外数据
-        credits = self.fetch_data(f"/tv/{tmdb_id}/credits") or {}
-        external_ids = self.fetch_data(f"/tv/{tmdb_id}/external_ids") or {}
-        content_ratings = self.fetch_data(f"/tv/{tmdb_id}/content_ratings") or {}
-        videos = self.fetch_data(f"/tv/{tmdb_id}/videos") or {}
-        
-        # 合并数据
-        combined = {
-            **series_data,
-            "credits": {"cast": credits.get("cast", [])},
-            "external_ids": external_ids,
-            "content_ratings": content_ratings,
-            "videos": videos
-        }
+            return False
+        self._open_people(output_dir)
         
-        # 过滤并保存剧集数据
-        filtered_series = self.filter_data(combined, TEMPLATES["series"])
-        with open(os.path.join(output_dir, "series.json"), "w", encoding="utf-8") as f:
-            json.dump(filtered_series, f, indent=2, ensure_ascii=False)
+        filtered_series = await self._with_fallback("series", self.project("series", series_data), f"/tv/{tmdb_id}")
+        await asyncio.to_thread(self._save_json, filtered_series, os.path.join(output_dir, "series.json"))
+        self._queue_artwork(series_data, os.path.join(output_dir, ""))
         print(f"剧集数据已保存至: {os.path.join(output_dir, 'series.json')}")
         
-        # 导出所有季
         seasons = [s for s in series_data.get("seasons", []) if s.get("season_number", 0) > 0]
         
+        layout = self._series_layout(combine_seasons, season_mapping)
+        unchanged = set()
+        episode_counts = {}
+        if self.incremental:
+            manifest = await asyncio.to_thread(self._manifest, output_dir)
+            unchanged = await self._unchanged_seasons(tmdb_id, seasons, manifest, layout)
+            episode_counts = {k: v for k, v in manifest.get("episode_counts", {}).items()
+                              if int(k) in unchanged}
+            if unchanged:
+                print(f"增量导出: 跳过未变化的季 {sorted(unchanged)}")
+        
         if combine_seasons:
-            print(f"合并所有季为一季")
-            self.export_combined_seasons(tmdb_id, seasons, output_dir, season_mapping)
+            if not seasons or len(unchanged) < len(seasons):
+                print(f"合并所有季为一季")
+                episode_counts = await self.export_combined_seasons(tmdb_id, seasons, output_dir, season_mapping)
         else:
-            for season in seasons:
-                orig_season_num = season["season_number"]
-                target_season_num = season_mapping.get(orig_season_num, orig_season_num) if season_mapping else orig_season_num
-                self.export_season(tmdb_id, orig_season_num, output_dir, target_season_num)
+            plan = self._season_plan(seasons, unchanged, season_mapping)
+            season_payloads = await self._gather(lambda p: self._fetch_season(tmdb_id, p[0]), plan)
+            fallbacks = await self._season_fallbacks(tmdb_id, [p[0] for p in plan], season_payloads)
+            episode_jobs = []
+            for (orig_season_num, target_season_num), season_data in zip(plan, season_payloads):
+                print(f"  导出季 #{orig_season_num} -> 季 #{target_season_num}")
+                if not season_data:
+                    print(f"警告: 无法获取季数据 (季: {orig_season_num})")
+                    continue
+                await asyncio.to_thread(self._save_season, season_data, output_dir, target_season_num,
+                                        fallbacks.get(orig_season_num))
+                for episode in season_data.get("episodes", []):
+                    episode_jobs.append((orig_season_num, episode["episode_number"], target_season_num))
+            
+            payloads = {orig_season_num: season_data for (orig_season_num, _), season_data in zip(plan, season_payloads)}
+            results = await self._gather(lambda job: self._export_episode(tmdb_id, job[0], job[1], output_dir,
+                                                                          target_season=job[2],
+                                                                          season_data=payloads[job[0]],
+                                                                          fallback=fallbacks.get(job[0])),
+                                         episode_jobs)
+            episode_counts.update(self._complete_seasons(plan, season_payloads, episode_jobs, results))
+        
+        await asyncio.to_thread(self._close_people, output_dir)
+        if self.incremental:
+            await asyncio.to_thread(self._save_manifest, output_dir, exported_at=started_at, layout=layout,
+                                    episode_counts=episode_counts)
+        await asyncio.to_thread(self.flush)
+        return len(episode_counts) == len(seasons)
     
-    def export_combined_seasons(self, series_id: int, seasons: List[Dict], output_dir: str, 
-                              season_mapping: Optional[Dict[int, int]] = None):
+    async def export_combined_seasons(self, series_id: int, seasons: List[Dict], output_dir: str,
+                                      season_mapping: Optional[Dict[int, int]] = None) -> Dict[str, int]:
         """将所有季合并为一季导出"""
-        # 确定目标季号
         target_season_num = season_mapping.get(1, 1) if season_mapping else 1
         
-        # 创建合并后的季元数据
-        combined_season = {
-            "name": "全集",
-            "overview": "所有季合并",
-            "air_date": seasons[0]["air_date"] if seasons else "1970-01-01T00:00:00.000Z",
-            "external_ids": {"tvdb_id": None},
-            "credits": {"cast": [], "crew": []}
-        }
-        
-        # 保存合并后的季数据
         season_file = os.path.join(output_dir, f"season-{target_season_num}.json")
-        with open(season_file, "w", encoding="utf-8") as f:
-            json.dump(combined_season, f, indent=2, ensure_ascii=False)
+        await asyncio.to_thread(self._save_json, self._combined_season(seasons), season_file)
         print(f"合并季数据已保存至: {season_file}")
         
-        # 导出所有集（合并后）
-        global_episode_number = 1
-        for season in seasons:
-            season_number = season["season_number"]
-            season_data = self.fetch_data(f"/tv/{series_id}/season/{season_number}")
+        if self.fast_episodes:
+            season_payloads = await self._gather(lambda s: self._fetch_season(series_id, s["season_number"]), seasons)
+        else:
+            season_payloads = await self._gather(
+                lambda s: self.fetch_data(f"/tv/{series_id}/season/{s['season_number']}"), seasons)
+        fallbacks = await self._season_fallbacks(series_id, [s["season_number"] for s in seasons],
+                                                 season_payloads, include_season=False)
+        episode_jobs = []
+        complete = {}
+        for season, season_data in zip(seasons, season_payloads):
             if not season_data:
-                print(f"警告: 无法获取季数据 (季: {season_number})")
+                print(f"警告: 无法获取季数据 (季: {season['season_number']})")
                 continue
-            
-            episodes = season_data.get("episodes", [])
-            for episode in episodes:
-                episode_number = episode["episode_number"]
-                success = self.export_episode(
-                    series_id, season_number, episode_number, output_dir,
-                    target_season=target_season_num, target_episode=global_episode_number
-                )
-                if success:
-                    global_episode_number += 1
-    
-    def export_season(self, series_id: int, orig_season_num: int, output_dir: str, target_season_num: int):
-        """导出单季元数据
+            complete[str(season["season_number"])] = len(season_data.get("episodes", []))
+            for episode in season_data.get("episodes", []):
+                episode_jobs.append((season["season_number"], episode["episode_number"]))
         
-        Args:
-            orig_season_num: TMDB中的原始季号
-            target_season_num: 要导出为的目标季号
-        """
+        payloads = {season["season_number"]: season_data for season, season_data in zip(seasons, season_payloads)}
+        episodes = await self._gather(lambda job: self._fetch_episode(series_id, job[0], job[1], payloads[job[0]],
+                                                                      fallbacks.get(job[0])), episode_jobs)
+        await asyncio.to_thread(self._save_combined_episodes, episode_jobs, episodes,
+                                output_dir, target_season_num, complete, payloads)
+        return complete
+    
+    async def _fetch_season(self, series_id: int, season_num: int) -> Optional[Dict]:
+        return await self.fetch_object("season", f"/tv/{series_id}/season/{season_num}")
+    
+    async def export_season(self, series_id: int, orig_season_num: int, output_dir: str, target_season_num: int):
+        """导出单季元数据"""
         print(f"  导出季 #{orig_season_num} -> 季 #{target_season_num}")
         
-        # 获取季数据
-        season_data = self.fetch_data(f"/tv/{series_id}/season/{orig_season_num}")
+        season_data = await self._fetch_season(series_id, orig_season_num)
         if not season_data:
             print(f"警告: 无法获取季数据 (季: {orig_season_num})")
             return
         
-        # 获取额外数据
-        credits = self.fetch_data(f"/tv/{series_id}/season/{orig_season_num}/credits") or {}
-        external_ids = self.fetch_data(f"/tv/{series_id}/season/{orig_season_num}/external_ids") or {}
-        
-        # 合并数据
-        combined = {
-            **season_data,
-            "credits": credits,
-            "external_ids": external_ids
-        }
-        
-        # 过滤并保存
-        filtered_season = self.filter_data(combined, TEMPLATES["season"])
-        season_file = os.path.join(output_dir, f"season-{target_season_num}.json")
-        with open(season_file, "w", encoding="utf-8") as f:
-            json.dump(filtered_season, f, indent=2, ensure_ascii=False)
+        fallbacks = await self._season_fallbacks(series_id, [orig_season_num], [season_data])
+        fallback = fallbacks.get(orig_season_num)
+        await asyncio.to_thread(self._save_season, season_data, output_dir, target_season_num, fallback)
         
-        # 导出所有集
-        for episode in season_data.get("episodes", []):
-            episode_number = episode["episode_number"]
-            self.export_episode(series_id, orig_season_num, episode_number, output_dir,
-                               target_season=target_season_num)
+        episode_numbers = [episode["episode_number"] for episode in season_data.get("episodes", [])]
+        await self._gather(lambda n: self._export_episode(series_id, orig_season_num, n, output_dir,
+                                                          target_season=target_season_num, season_data=season_data,
+                                                          fallback=fallback),
+                           episode_numbers)
+        await asyncio.to_thread(self.flush)
     
-    def export_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int, 
-                      output_dir: str, target_season: Optional[int] = None, 
-                      target_episode: Optional[int] = None) -> bool:
-        """导出单集元数据
-        
-        Args:
-            orig_season_num: TMDB中的原始季号
-            orig_episode_num: TMDB中的原始集号
-            target_season: 要导出为的目标季号
-            target_episode: 要导出为的目标集号
-            
-        返回: 是否成功导出
-        """
-        # 确定文件名
-        if target_season is not None and target_episode is not None:
-            filename = f"season-{target_season}-episode-{target_episode}.json"
-        elif target_season is not None:
-            filename = f"season-{target_season}-episode-{orig_episode_num}.json"
+    async def _fetch_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int,
+                             season_data: Optional[Dict] = None, fallback: Optional[Dict] = None) -> Optional[Dict]:
+        endpoint = f"/tv/{series_id}/season/{orig_season_num}/episode/{orig_episode_num}"
+        entry = self._season_entry(season_data, orig_episode_num) if self.fast_episodes else None
+        if entry is not None:
+            extras = None
+            if self.fast_extras:
+                extras = await self.fetch_data(endpoint, self._fast_extra_params())
+                if not extras:
+                    print(f"警告: 无法获取集数据 (S{orig_season_num}E{orig_episode_num})")
+                    return None
+            combined = self._episode_from_season(entry, season_data, extras)
         else:
-            filename = f"season-{orig_season_num}-episode-{orig_episode_num}.json"
+            combined = await self.fetch_object("episode", endpoint)
+            if not combined:
+                print(f"警告: 无法获取集数据 (S{orig_season_num}E{orig_episode_num})")
+                return None
         
+        return fill_missing_text("episode", self.project("episode", combined),
+                                 self._season_entry(fallback, orig_episode_num))
+    
+    async def export_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int,
+                             output_dir: str, target_season: Optional[int] = None,
+                             target_episode: Optional[int] = None, season_data: Optional[Dict] = None,
+                             fallback: Optional[Dict] = None) -> bool:
+        """导出单集元数据，返回是否成功导出"""
+        success = await self._export_episode(series_id, orig_season_num, orig_episode_num, output_dir,
+                                             target_season, target_episode, season_data, fallback)
+        await asyncio.to_thread(self.flush)
+        return success
+    
+    async def _export_episode(self, series_id: int, orig_season_num: int, orig_episode_num: int,
+                              output_dir: str, target_season: Optional[int] = None,
+                              target_episode: Optional[int] = None, season_data: Optional[Dict] = None,
+                              fallback: Optional[Dict] = None) -> bool:
+        filename = self._episode_filename(orig_season_num, orig_episode_num, target_season, target_episode)
         print(f"    导出集: S{orig_season_num}E{orig_episode_num} -> {filename}")
         
-        # 获取集数据
-        endpoint = f"/tv/{series_id}/season/{orig_season_num}/episode/{orig_episode_num}"
-        episode_data = self.fetch_data(endpoint)
-        if not episode_data:
-            print(f"警告: 无法获取集数据 (S{orig_season_num}E{orig_episode_num})")
+        filtered_episode = await self._fetch_episode(series_id, orig_season_num, orig_episode_num,
+                                                     season_data, fallback)
+        if filtered_episode is None:
             return False
         
-        # 获取额外数据
-        credits = self.fetch_data(f"{endpoint}/credits") or {}
-        external_ids = self.fetch_data(f"{endpoint}/external_ids") or {}
-        videos = self.fetch_data(f"{endpoint}/videos") or {}
-        
-        # 合并数据
-        combined = {
-            **episode_data,
-            "credits": credits,
-            "external_ids": external_ids,
-            "videos": videos
-        }
-        
-        # 过滤并保存
-        filtered_episode = self.filter_data(combined, TEMPLATES["episode"])
-        ep_file = os.path.join(output_dir, filename)
-        with open(ep_file, "w", encoding="utf-8") as f:
-            json.dump(filtered_episode, f, indent=2, ensure_ascii=False)
+        await asyncio.to_thread(self._save_json, filtered_episode, os.path.join(output_dir, filename))
+        self._queue_artwork(self._season_entry(season_data, orig_episode_num),
+                            os.path.join(output_dir, filename[:-len(".json")] + "-"))
         return True
     
-    def export_collection(self, tmdb_id: int, output_dir: str):
+    async def export_collection(self, tmdb_id: int, output_dir: str, data: Optional[Dict] = None) -> bool:
         """导出合集元数据"""
         print(f"\n开始导出合集 ID: {tmdb_id}")
-        os.makedirs(output_dir, exist_ok=True)
+        self._makedirs(output_dir)
         
-        collection_data = self.fetch_data(f"/collection/{tmdb_id}")
+        collection_data = data or await self.fetch_data(f"/collection/{tmdb_id}")
         if not collection_data:
             print(f"错误: 无法获取合集数据 (ID: {tmdb_id})")
-            return
+            return False
         
-        filtered = self.filter_data(collection_data, TEMPLATES["collection"])
-        with open(os.path.join(output_dir, "all.json"), "w", encoding="utf-8") as f:
-            json.dump(filtered, f, indent=2, ensure_ascii=False)
+        filtered = await self._with_fallback("collection", self.project("collection", collection_data),
+                                             f"/collection/{tmdb_id}")
+        await asyncio.to_thread(self._save_json, filtered, os.path.join(output_dir, "all.json"))
+        self._queue_artwork(collection_data, os.path.join(output_dir, ""))
         print(f"合集数据已保存至: {os.path.join(output_dir, 'all.json')}")
+        if self.incremental:
+            await asyncio.to_thread(self._save_manifest, output_dir, exported_at=time.time())
+        await asyncio.to_thread(self.flush)
+        return True
+
+
+def parse_item_fields(values: List[str]) -> Dict[str, Tuple[str, ...]]:
+    """解析列表元素字段裁剪参数，每项格式为 '键路径=字段,字段'"""
+    item_fields = {}
+    for value in values:
+        path, _, fields = value.partition("=")
+        path = path.strip()
+        keep = tuple(f.strip() for f in fields.split(",") if f.strip())
+        if path not in template_list_paths() or not keep:
+            print(f"警告: 无效的列表字段裁剪 '{value}'，将被忽略")
+            continue
+        item_fields[path] = keep
+    return item_fields
+
+
+def parse_artwork_sizes(value: str) -> Dict[str, str]:
+    """解析图片尺寸参数 '类型=尺寸,类型=尺寸'，未指定的类型使用 ARTWORK_SIZES 中的默认尺寸"""
+    sizes = dict(ARTWORK_SIZES)
+    for pair in filter(None, (p.strip() for p in value.split(","))):
+        kind, _, size = pair.partition("=")
+        if kind.strip() not in ARTWORK_SIZES or not size.strip():
+            print(f"警告: 无效的图片尺寸 '{pair}'，将被忽略")
+            continue
+        sizes[kind.strip()] = size.strip()
+    return sizes
 
 
 def parse_season_mapping(mapping_str: str) -> Dict[int, int]:
@@ -348,12 +2437,453 @@ def parse_season_mapping(mapping_str: str) -> Dict[int, int]:
     return mapping
 
 
+CONTENT_TYPES = ["auto", "movie", "tv", "collection"]
+
+
+def export_by_type(exporter: TMDBExporter, tmdb_id: int, content_type: str, output: str,
+                   combine_seasons: bool = False,
+                   season_mapping: Optional[Dict[int, int]] = None) -> bool:
+    """按内容类型导出到 {output}/{tmdbid}/{movie|series|collection}
+    
+    返回: 是否成功导出
+    """
+    # 创建类型目录
+    output_dir = os.path.join(output, f"{tmdb_id}")
+    
+    data = None
+    if content_type == "auto":
+        # 检测类型，检测时获取的数据直接用于导出
+        content_type, data = exporter.detect_type(tmdb_id)
+        if content_type is None:
+            print("错误: 无法确定内容类型，请手动指定 --type 参数")
+            return False
+    
+    if content_type == "movie":
+        return exporter.export_movie(tmdb_id, os.path.join(output_dir, "movie"), data=data)
+    
+    elif content_type == "tv":
+        return exporter.export_series(tmdb_id, os.path.join(output_dir, "series"), 
+                                      combine_seasons=combine_seasons,
+                                      season_mapping=season_mapping,
+                                      data=data)
+    
+    elif content_type == "collection":
+        return exporter.export_collection(tmdb_id, os.path.join(output_dir, "collection"), data=data)
+    
+    return False
+
+
+def read_batch_manifest(path: str) -> List[Dict]:
+    """读取批量导出清单
+    
+    支持 CSV（带表头）和 JSONL（每行一个对象），字段:
+        id: TMDB ID（必需）
+        type: auto / movie / tv / collection（默认 auto）
+        combine_seasons: 是否合并所有季（true/false/1/0）
+        season_mapping: 季号映射，格式同 --season-mapping；JSONL 中也可以是对象
+    """
+    if path.lower().endswith((".jsonl", ".json")):
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    
+    jobs = []
+    for line_no, row in enumerate(rows, 1):
+        try:
+            jobs.append(parse_job(row))
+        except ValueError as e:
+            print(f"警告: 清单第 {line_no} 条{e}，将被忽略")
+    return jobs
+
+
+def parse_job(row: Dict) -> Dict:
+    """把清单行或服务模式提交的任务规范化为 {id, type, combine_seasons, season_mapping}
+    
+    字段无效时抛出 ValueError，消息说明原因
+    """
+    try:
+        tmdb_id = int(row["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("缺少有效的 id")
+    
+    content_type = str(row.get("type") or "auto").strip()
+    if content_type not in CONTENT_TYPES:
+        raise ValueError(f"类型无效 '{content_type}'")
+    
+    combine = row.get("combine_seasons") or False
+    if isinstance(combine, str):
+        combine = combine.strip().lower() in ("1", "true", "yes", "y")
+    
+    mapping = row.get("season_mapping") or {}
+    if isinstance(mapping, dict):
+        try:
+            mapping = {int(k): int(v) for k, v in mapping.items()}
+        except (TypeError, ValueError):
+            raise ValueError("季号映射无效")
+    else:
+        mapping = parse_season_mapping(str(mapping))
+    
+    return {"id": tmdb_id, "type": content_type,
+            "combine_seasons": bool(combine), "season_mapping": mapping}
+
+
+def batch_job_key(job: Dict) -> str:
+    """任务在日志中的唯一标识，导出参数不同视为不同任务"""
+    return json.dumps([job["id"], job["type"], job["combine_seasons"],
+                       sorted(job["season_mapping"].items())])
+
+
+def load_journal(path: str) -> set:
+    """读取日志中已完成的任务，忽略被中断时写了一半的最后一行"""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "done":
+                    done.add(record["job"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def run_batch(exporter: TMDBExporter, jobs: List[Dict], output: str, journal_path: str) -> List[Dict]:
+    """用同一个导出器依次执行批量任务，每完成一个任务追加一行日志
+    
+    再次运行时跳过日志中已完成的任务，从中断处继续
+    
+    返回: 失败的任务列表
+    """
+    done = load_journal(journal_path)
+    failed = []
+    exported = 0
+    skipped = 0
+    started_at = time.time()
+    
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        for index, job in enumerate(jobs, 1):
+            key = batch_job_key(job)
+            if key in done:
+                skipped += 1
+                continue
+            
+            print(f"\n[{index}/{len(jobs)}] 导出 {job['type']} {job['id']}")
+            try:
+                success = export_by_type(exporter, job["id"], job["type"], output,
+                                         combine_seasons=job["combine_seasons"],
+                                         season_mapping=job["season_mapping"])
+            except Exception as e:
+                # 单个任务出错不中断整个批量导出
+                print(f"错误: 导出 {job['id']} 时发生异常: {e}")
+                success = False
+            
+            append_journal(journal, key, success)
+            if success:
+                done.add(key)
+                exported += 1
+            else:
+                failed.append(job)
+    
+    print_batch_summary(started_at, exported, skipped, failed)
+    return failed
+
+
+def append_journal(journal, key: str, success: bool):
+    """追加一条任务记录并立即落盘"""
+    journal.write(json.dumps({"job": key, "status": "done" if success else "failed",
+                              "at": time.time()}) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def print_batch_summary(started_at: float, exported: int, skipped: int, failed: List[Dict]):
+    """输出批量导出汇总"""
+    print("\n" + "=" * 60)
+    print(f"批量导出完成，用时 {time.time() - started_at:.1f} 秒")
+    print(f"  成功: {exported}  已跳过(此前完成): {skipped}  失败: {len(failed)}")
+    for job in failed:
+        print(f"  ✗ {job['type']} {job['id']}")
+
+
+async def export_by_type_async(exporter: AsyncTMDBExporter, tmdb_id: int, content_type: str, output: str,
+                               combine_seasons: bool = False,
+                               season_mapping: Optional[Dict[int, int]] = None) -> bool:
+    """export_by_type 的协程版本"""
+    output_dir = os.path.join(output, f"{tmdb_id}")
+    
+    data = None
+    if content_type == "auto":
+        content_type, data = await exporter.detect_type(tmdb_id)
+        if content_type is None:
+            print("错误: 无法确定内容类型，请手动指定 --type 参数")
+            return False
+    
+    if content_type == "movie":
+        return await exporter.export_movie(tmdb_id, os.path.join(output_dir, "movie"), data=data)
+    
+    elif content_type == "tv":
+        return await exporter.export_series(tmdb_id, os.path.join(output_dir, "series"),
+                                            combine_seasons=combine_seasons,
+                                            season_mapping=season_mapping,
+                                            data=data)
+    
+    elif content_type == "collection":
+        return await exporter.export_collection(tmdb_id, os.path.join(output_dir, "collection"), data=data)
+    
+    return False
+
+
+async def run_batch_async(exporter: AsyncTMDBExporter, jobs: List[Dict], output: str,
+                          journal_path: str, concurrency: int = 8) -> List[Dict]:
+    """run_batch 的协程版本，concurrency 个工作协程从队列中取条目导出
+    
+    所有条目的请求共享导出器的并发上限和限速器；日志在线程中依次写入并落盘，不阻塞事件循环
+    """
+    done = load_journal(journal_path)
+    pending = asyncio.Queue()
+    for index, job in enumerate(jobs, 1):
+        if batch_job_key(job) not in done:
+            pending.put_nowait((index, job))
+    skipped = len(jobs) - pending.qsize()
+    failed = []
+    exported = 0
+    started_at = time.time()
+    journal_lock = asyncio.Lock()
+    
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        async def worker():
+            nonlocal exported
+            while not pending.empty():
+                index, job = pending.get_nowait()
+                print(f"\n[{index}/{len(jobs)}] 导出 {job['type']} {job['id']}")
+                try:
+                    success = await export_by_type_async(exporter, job["id"], job["type"], output,
+                                                         combine_seasons=job["combine_seasons"],
+                                                         season_mapping=job["season_mapping"])
+                except Exception as e:
+                    # 单个任务出错不中断整个批量导出
+                    print(f"错误: 导出 {job['id']} 时发生异常: {e}")
+                    success = False
+                async with journal_lock:
+                    await asyncio.to_thread(append_journal, journal, batch_job_key(job), success)
+                if success:
+                    exported += 1
+                else:
+                    failed.append(job)
+        
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, pending.qsize())))))
+    
+    print_batch_summary(started_at, exported, skipped, failed)
+    return failed
+    print_batch_summary(started_at, exported, skipped, failed)
+    return failed
+
+
+class ExportService:
+    """服务模式的任务队列：复用同一个导出器，按优先级依次执行提交的导出任务
+    
+    所有任务共享导出器的 HTTP 连接、响应缓存、限速器和并发控制器，
+    因此多个任务同时执行时整体请求速率仍不超过 API 限制。
+    
+    Args:
+        exporter: 导出器
+        output: 输出根目录，任务未指定输出目录时使用，任务指定的输出目录必须位于其中
+        runners: 同时执行的任务数
+        history: 保留状态的已结束任务数
+    """
+    def __init__(self, exporter: TMDBExporter, output: str, runners: int = 1, history: int = 1000):
+        self.exporter = exporter
+        self.output = output
+        self.lock = threading.Lock()
+        self.queue = queue.PriorityQueue()
+        self.jobs = {}      # 任务编号 -> 任务状态
+        self.active = {}    # (任务标识, 输出目录) -> 排队或执行中的任务编号
+        self.finished = deque()
+        self.history = history
+        self.next_id = 1
+        self.threads = [threading.Thread(target=self._run, daemon=True, name=f"export-job-{i}")
+                        for i in range(max(1, runners))]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, row: Dict) -> Dict:
+        """提交任务，字段同批量清单，另可指定 output 和 priority（越大越先执行）
+        
+        相同参数的任务已在排队或执行时直接返回该任务，不重复导出
+        
+        返回: 任务状态
+        """
+        job = parse_job(row)
+        try:
+            priority = int(row.get("priority") or 0)
+        except (TypeError, ValueError):
+            raise ValueError("priority 必须是整数")
+        output = self._resolve_output(row.get("output"))
+        active_key = (batch_job_key(job), output)
+        with self.lock:
+            existing = self.active.get(active_key)
+            if existing is not None:
+                return dict(self.jobs[existing])
+            job_id = self.next_id
+            self.next_id += 1
+            job.update(job=job_id, output=output, priority=priority, status="queued",
+                       submitted_at=time.time(), started_at=None, finished_at=None)
+            self.jobs[job_id] = job
+            self.active[active_key] = job_id
+            self.queue.put((-priority, job_id))
+            return dict(job)
+    
+    def _resolve_output(self, output: Any) -> str:
+        """解析任务的输出目录：相对路径相对于输出根目录，解析符号链接后必须位于输出根目录内"""
+        root = os.path.realpath(self.output)
+        path = os.path.realpath(os.path.join(root, str(output or "")))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"output 必须位于服务的输出目录内: {self.output}")
+        return path
+    
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def list_jobs(self) -> List[Dict]:
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+    
+    def status(self) -> Dict:
+        """各状态的任务数及导出器的请求统计"""
+        counts = defaultdict(int)
+        with self.lock:
+            for job in self.jobs.values():
+                counts[job["status"]] += 1
+        return {"jobs": dict(counts), "metrics": self.exporter.metrics.summary()}
+    
+    def _run(self):
+        while True:
+            _, job_id = self.queue.get()
+            if job_id is None:
+                return
+            with self.lock:
+                job = self.jobs[job_id]
+                job.update(status="running", started_at=time.time())
+            print(f"\n[任务 {job_id}] 导出 {job['type']} {job['id']} 至 {job['output']}")
+            try:
+                success = export_by_type(self.exporter, job["id"], job["type"], job["output"],
+                                         combine_seasons=job["combine_seasons"],
+                                         season_mapping=job["season_mapping"])
+            except Exception as e:
+                # 单个任务出错不影响服务
+                print(f"错误: 任务 {job_id} 发生异常: {e}")
+                success = False
+            with self.lock:
+                job.update(status="done" if success else "failed", finished_at=time.time())
+                self.active.pop((batch_job_key(job), job["output"]), None)
+                # 同一目录没有其他排队或执行中的任务时释放该任务的增量清单
+                if not any(self.jobs[other]["id"] == job["id"] and self.jobs[other]["output"] == job["output"]
+                           for other in self.active.values()):
+                    self.exporter.release_manifests(os.path.join(job["output"], str(job["id"])))
+                self.finished.append(job_id)
+                while len(self.finished) > self.history:
+                    self.jobs.pop(self.finished.popleft(), None)
+    
+    def stop(self):
+        """等待执行中的任务完成后停止，尚未开始的任务不再执行"""
+        for _ in self.threads:
+            self.queue.put((float("-inf"), None))
+        for thread in self.threads:
+            thread.join()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """服务模式的 HTTP 接口
+    
+    POST /jobs         提交任务（JSON），返回 202 和任务状态
+    GET  /jobs         所有任务的状态
+    GET  /jobs/{编号}  单个任务的状态
+    GET  /status       各状态的任务数和请求统计
+    """
+    service: ExportService = None
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send_json(self, status: int, data: Any):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/status":
+            return self._send_json(200, self.service.status())
+        if path == "/jobs":
+            return self._send_json(200, self.service.list_jobs())
+        match = re.fullmatch(r"/jobs/(\d+)", path)
+        job = self.service.get(int(match.group(1))) if match else None
+        if job is None:
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, job)
+    
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            row = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(row, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+            job = self.service.submit(row)
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, job)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """监听 Unix socket 的 HTTP 服务"""
+    daemon_threads = True
+    
+    def get_request(self):
+        # BaseHTTPRequestHandler 需要 (主机, 端口) 形式的客户端地址
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def make_service_server(listen: str, handler: type) -> socketserver.BaseServer:
+    """按监听地址创建服务：'主机:端口' 为 TCP，'unix:路径' 为 Unix socket"""
+    if listen.startswith("unix:"):
+        path = listen[len("unix:"):]
+        # 清理上次运行留下的 socket 文件
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+        return UnixHTTPServer(path, handler)
+    host, _, port = listen.rpartition(":")
+    return ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+
+
 def main():
+    if sys.argv[1:2] == ["expand"]:
+        main_expand(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["serve"]:
+        main_serve(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(description="TMDB元数据导出工具")
-    parser.add_argument("tmdbid", type=int, help="TMDB ID")
+    parser.add_argument("tmdbid", type=int, nargs="?", help="TMDB ID（使用 --batch 时省略）")
     parser.add_argument("apikey", type=str, help="TMDB API密钥")
     parser.add_argument("output", type=str, help="输出目录路径")
-    parser.add_argument("--type", choices=["auto", "movie", "tv", "collection"], 
+    parser.add_argument("--type", choices=CONTENT_TYPES, 
                         default="auto", help="内容类型 (默认自动检测)")
     parser.add_argument("--apiversion", choices=["v3", "v4"], default="v3", 
                         help="API版本 (默认v3)")
@@ -361,47 +2891,215 @@ def main():
                         help="将所有季合并为一季（仅对剧集有效）")
     parser.add_argument("--season-mapping", type=str, default="",
                         help="季号映射，格式 '原季号=新季号,原季号=新季号' (例如 '1=2')")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="并发请求线程数，所有线程共享 40 请求/10 秒的限速 (默认4)")
+    parser.add_argument("--cache-dir", type=str, default="",
+                        help="响应缓存目录，指定后重复导出直接使用本地缓存")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="缓存大小上限，单位MB (默认1024)")
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument("--offline", action="store_true",
+                            help="只使用缓存，不访问网络（需要 --cache-dir）")
+    cache_mode.add_argument("--refresh", action="store_true",
+                            help="忽略缓存有效期，向服务端重新验证所有缓存（需要 --cache-dir）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量导出：内容未变化的文件不重写，未变化的季不重新获取")
+    parser.add_argument("--batch", type=str, default="",
+                        help="批量导出清单（CSV 或 JSONL，字段 id,type,combine_seasons,season_mapping）")
+    parser.add_argument("--journal", type=str, default="",
+                        help="批量导出进度日志路径 (默认 {output}/.export-journal.jsonl)")
+    parser.add_argument("--list-fields", action="append", default=[],
+                        help="只保留列表元素的指定字段，格式 '键路径=字段,字段'，可重复 "
+                             "(例如 'credits.cast=id,name,character,profile_path')")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="使用 asyncio 后端（需要 aiohttp），此时 --workers 为最大并发请求数")
+    parser.add_argument("--format", choices=["dir", "bundle"], default="dir",
+                        help="输出格式：dir 为每个对象一个 JSON 文件，bundle 为打包到输出目录下的 "
+                             f"{BUNDLE_FILE} (默认dir)")
+    parser.add_argument("--fast-episodes", action="store_true",
+                        help="用季数据构造集数据，不再逐集请求；季数据中没有的 "
+                             f"{','.join(FAST_EPISODE_EXTRAS)} 使用模板默认值")
+    parser.add_argument("--fast-episode-extras", type=str, default="", metavar="FIELDS",
+                        help="--fast-episodes 时仍逐集补充请求的字段，逗号分隔 "
+                             f"({','.join(FAST_EPISODE_EXTRAS)})，每集多一次请求")
+    parser.add_argument("--fallback-language", type=str, default="en-US",
+                        help="名称、简介等在中文中为空时使用的回退语言，'' 表示不回退 (默认en-US)")
+    parser.add_argument("--people-table", action="store_true",
+                        help=f"剧集的演职员信息只在 {PEOPLE_FILE} 中保存一次，剧集、季、集文档中只保留 id 和角色")
+    parser.add_argument("--compact", action="store_true",
+                        help="输出不缩进的紧凑 JSON，文件更小、写入更快")
+    parser.add_argument("--fsync", action="store_true",
+                        help="确保输出文件落盘后才算完成（逐个 fsync，目录输出时有效）")
+    parser.add_argument("--artwork", action="store_true",
+                        help="同时下载海报、背景图、季海报和剧照，保存在对应 JSON 旁边")
+    parser.add_argument("--artwork-sizes", type=str, default="",
+                        help="各类图片的尺寸，格式 '类型=尺寸,...'，类型为 poster/backdrop/still "
+                             "(例如 'poster=w500,backdrop=w1280,still=w300'，默认 original)")
+    parser.add_argument("--artwork-workers", type=int, default=8,
+                        help="同时下载的图片数 (默认8)")
+    parser.add_argument("--artwork-bandwidth", type=float, default=0,
+                        help="图片下载带宽上限，单位MB/秒，0 为不限 (默认0)")
+    parser.add_argument("--metrics-out", type=str, default="",
+                        help="导出结束后写出请求统计，.prom 结尾为 Prometheus textfile 格式，否则为 JSON")
     
     args = parser.parse_args()
-    exporter = TMDBExporter(args.apikey, args.apiversion)
+    if (args.offline or args.refresh) and not args.cache_dir:
+        parser.error("--offline 和 --refresh 需要同时指定 --cache-dir")
+    if bool(args.batch) == (args.tmdbid is not None):
+        parser.error("请指定 tmdbid 或 --batch 其中之一")
     
-    # 解析季号映射
-    season_mapping = parse_season_mapping(args.season_mapping)
+    if args.use_async and aiohttp is None:
+        parser.error("--async 需要安装 aiohttp: pip install aiohttp")
+    if args.artwork and (args.offline or args.format == "bundle"):
+        parser.error("--artwork 不能与 --offline 或 --format bundle 同时使用")
     
-    # 创建类型目录
-    output_dir = os.path.join(args.output, f"{args.tmdbid}")
+    fast_episodes = None
+    if args.fast_episode_extras and not args.fast_episodes:
+        parser.error("--fast-episode-extras 需要与 --fast-episodes 同时使用")
+    if args.fast_episodes:
+        fast_episodes = tuple(filter(None, (field.strip() for field in args.fast_episode_extras.split(","))))
+        unknown = set(fast_episodes) - set(FAST_EPISODE_EXTRAS)
+        if unknown:
+            parser.error(f"--fast-episode-extras 不支持的字段: {','.join(sorted(unknown))}")
     
-    if args.type == "auto":
-        # 尝试检测类型
-        movie_test = exporter.fetch_data(f"/movie/{args.tmdbid}")
-        if movie_test:
-            exporter.export_movie(args.tmdbid, os.path.join(output_dir, "movie"))
-            return
+    cache = ResponseCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    metrics = ExportMetrics()
+    bundle = None
+    if args.format == "bundle":
+        os.makedirs(args.output, exist_ok=True)
+        bundle = ExportBundle(os.path.join(args.output, BUNDLE_FILE), root=args.output)
+    artwork = None
+    if args.artwork:
+        artwork = ArtworkDownloader(parse_artwork_sizes(args.artwork_sizes), max(1, args.artwork_workers),
+                                    args.artwork_bandwidth * 1024 * 1024, metrics)
+    options = dict(workers=args.workers, cache=cache, offline=args.offline,
+                   refresh=args.refresh, incremental=args.incremental,
+                   item_fields=parse_item_fields(args.list_fields), metrics=metrics, bundle=bundle,
+                   compact=args.compact, fsync=args.fsync, fast_episodes=fast_episodes,
+                   fallback_language=args.fallback_language, artwork=artwork,
+                   people_table=args.people_table)
+    
+    try:
+        run_export(args, options)
+    finally:
+        if artwork:
+            artwork.close()
+            counts = artwork.counts
+            print(f"图片: 下载 {counts['downloaded']} 张，已存在跳过 {counts['skipped']} 张，失败 {counts['failed']} 张")
+        if bundle:
+            bundle.close()
+            print(f"导出内容已打包至: {bundle.path}")
+        # 批量导出以 sys.exit 结束时也写出统计
+        if args.metrics_out:
+            metrics.write(args.metrics_out)
+            print(f"请求统计已写入: {args.metrics_out}")
+
+
+def main_expand(argv: List[str]):
+    """tmdb_export.py expand：把打包文件还原为目录输出的文件结构"""
+    parser = argparse.ArgumentParser(prog="tmdb_export.py expand", description="将 --format bundle 的打包文件展开为目录")
+    parser.add_argument("bundle", type=str, help=f"打包文件路径（例如 ./output/{BUNDLE_FILE}）")
+    parser.add_argument("output", type=str, help="展开到的目录")
+    parser.add_argument("--prefix", type=str, default="",
+                        help="只展开指定前缀下的文件，例如 '1399/'")
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.bundle):
+        parser.error(f"打包文件不存在: {args.bundle}")
+    
+    bundle = ExportBundle(args.bundle)
+    try:
+        count = bundle.expand(args.output, args.prefix)
+    finally:
+        bundle.close()
+    print(f"已展开 {count} 个文件至: {args.output}")
+
+
+def main_serve(argv: List[str]):
+    """tmdb_export.py serve：常驻服务，通过 HTTP 接口接收导出任务"""
+    parser = argparse.ArgumentParser(prog="tmdb_export.py serve", description="以服务模式运行，接收导出任务")
+    parser.add_argument("apikey", type=str, help="TMDB API密钥")
+    parser.add_argument("output", type=str, help="输出根目录（任务可用 output 字段指定其中的子目录）")
+    parser.add_argument("--listen", type=str, default="127.0.0.1:8600",
+                        help="监听地址，'主机:端口' 或 'unix:socket路径' (默认127.0.0.1:8600)")
+    parser.add_argument("--apiversion", choices=["v3", "v4"], default="v3", help="API版本 (默认v3)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="并发请求线程数，所有任务共享 40 请求/10 秒的限速 (默认4)")
+    parser.add_argument("--jobs", type=int, default=1, help="同时执行的任务数 (默认1)")
+    parser.add_argument("--history", type=int, default=1000, help="保留状态的已结束任务数 (默认1000)")
+    parser.add_argument("--cache-dir", type=str, default="",
+                        help="响应缓存目录，不指定时只使用内存缓存")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="磁盘缓存大小上限，单位MB (默认1024)")
+    parser.add_argument("--hot-cache", type=int, default=4096,
+                        help="内存缓存的响应条数上限 (默认4096)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量导出：内容未变化的文件不重写，未变化的季不重新获取")
+    parser.add_argument("--list-fields", action="append", default=[],
+                        help="只保留列表元素的指定字段，格式 '键路径=字段,字段'，可重复")
+    parser.add_argument("--fallback-language", type=str, default="en-US",
+                        help="名称、简介等在中文中为空时使用的回退语言，'' 表示不回退 (默认en-US)")
+    parser.add_argument("--compact", action="store_true", help="输出不缩进的紧凑 JSON")
+    parser.add_argument("--fsync", action="store_true", help="确保输出文件落盘后才算完成")
+    args = parser.parse_args(argv)
+    
+    backing = ResponseCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    cache = HotCache(backing, args.hot_cache)
+    exporter = TMDBExporter(args.apikey, args.apiversion, workers=args.workers, cache=cache,
+                            incremental=args.incremental, item_fields=parse_item_fields(args.list_fields),
+                            metrics=ExportMetrics(), compact=args.compact, fsync=args.fsync,
+                            fallback_language=args.fallback_language)
+    service = ExportService(exporter, args.output, runners=args.jobs, history=args.history)
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    server = make_service_server(args.listen, handler)
+    print(f"服务已启动，监听 {args.listen}，默认输出目录: {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务，等待执行中的任务完成...")
+    finally:
+        server.server_close()
+        service.stop()
+        exporter.close()
+        cache.close()
+        print("服务已停止")
+
+
+def run_export(args: argparse.Namespace, options: Dict):
+    """按命令行参数执行导出"""
+    if args.use_async:
+        asyncio.run(main_async(args, options))
+        return
+    
+    with TMDBExporter(args.apikey, args.apiversion, **options) as exporter:
+        if args.batch:
+            jobs = read_batch_manifest(args.batch)
+            os.makedirs(args.output, exist_ok=True)
+            journal_path = args.journal or os.path.join(args.output, ".export-journal.jsonl")
+            failed = run_batch(exporter, jobs, args.output, journal_path)
+            sys.exit(1 if failed else 0)
         
-        tv_test = exporter.fetch_data(f"/tv/{args.tmdbid}")
-        if tv_test:
-            exporter.export_series(args.tmdbid, os.path.join(output_dir, "series"), 
-                                  combine_seasons=args.combine_seasons,
-                                  season_mapping=season_mapping)
-            return
+        # 解析季号映射
+        season_mapping = parse_season_mapping(args.season_mapping)
         
-        collection_test = exporter.fetch_data(f"/collection/{args.tmdbid}")
-        if collection_test:
-            exporter.export_collection(args.tmdbid, os.path.join(output_dir, "collection"))
+        export_by_type(exporter, args.tmdbid, args.type, args.output,
+                       combine_seasons=args.combine_seasons, season_mapping=season_mapping)
+
+
+async def main_async(args: argparse.Namespace, options: Dict):
+    """--async 模式的入口"""
+    async with AsyncTMDBExporter(args.apikey, args.apiversion, **options) as exporter:
+        if args.batch:
+            jobs = read_batch_manifest(args.batch)
+            os.makedirs(args.output, exist_ok=True)
+            journal_path = args.journal or os.path.join(args.output, ".export-journal.jsonl")
+            failed = await run_batch_async(exporter, jobs, args.output, journal_path)
+            if failed:
+                sys.exit(1)
             return
         
-        print("错误: 无法确定内容类型，请手动指定 --type 参数")
-    
-    elif args.type == "movie":
-        exporter.export_movie(args.tmdbid, os.path.join(output_dir, "movie"))
-    
-    elif args.type == "tv":
-        exporter.export_series(args.tmdbid, os.path.join(output_dir, "series"), 
-                              combine_seasons=args.combine_seasons,
-                              season_mapping=season_mapping)
-    
-    elif args.type == "collection":
-        exporter.export_collection(args.tmdbid, os.path.join(output_dir, "collection"))
+        season_mapping = parse_season_mapping(args.season_mapping)
+        await export_by_type_async(exporter, args.tmdbid, args.type, args.output,
+                                   combine_seasons=args.combine_seasons, season_mapping=season_mapping)
 
 
 if __name__ == "__main__":